@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the accelerator pipeline.
+
+Generates a synthetic Synapse corpus (see synthetic_corpus.py), then runs
+run_step5, run_step6 (fed in-process with the step 5 result) and a standalone
+process_sql_files pass against the stub CLI in tests/mock_cli, with a
+configurable per-call latency. Reports throughput (files/s, MB/s), p50/p95
+latency per file and per stage, and peak memory.
+
+Results can be saved as a baseline under benchmarks/baselines/<name>.json; later
+runs with the same name are compared against it and regressions beyond
+--tolerance make the harness exit with code 1.
+
+Example:
+  python benchmarks/run_benchmark.py --files 200 --latency 0.05 --workers 8 --save-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+BASELINE_DIR = ROOT_DIR / "benchmarks" / "baselines"
+sys.path.insert(0, str(ROOT_DIR / "scripts" / "python_steps"))
+sys.path.insert(0, str(ROOT_DIR / "benchmarks"))
+
+from synthetic_corpus import generate_corpus  # noqa: E402
+
+# metric -> True when higher is better
+TRACKED_METRICS = {
+    "files_per_s": True,
+    "mb_per_s": True,
+    "per_file_p50_s": False,
+    "per_file_p95_s": False,
+    "peak_rss_kb": False,
+}
+
+
+def percentile(values, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def span_file_stem(name: str):
+    # run_cmd spans are titled "Transpile <file>"
+    if name.startswith("Transpile "):
+        name = name[len("Transpile "):]
+    return Path(name).stem
+
+
+def summarize(spans, stems, total_files: int, total_bytes: int, wall_s: float, self_rss_kb):
+    per_stage = {}
+    per_file = {}
+    for span in spans:
+        if span["wall_s"] is None:
+            continue
+        per_stage.setdefault(span["stage"], []).append(span["wall_s"])
+        stem = span_file_stem(span["name"])
+        if stem in stems:
+            per_file[stem] = per_file.get(stem, 0.0) + span["wall_s"]
+    child_rss = [span["peak_rss_kb"] for span in spans if span["peak_rss_kb"]]
+    return {
+        "files": total_files,
+        "mb": round(total_bytes / (1024 * 1024), 3),
+        "wall_s": round(wall_s, 3),
+        "files_per_s": round(total_files / wall_s, 3) if wall_s else None,
+        "mb_per_s": round(total_bytes / (1024 * 1024) / wall_s, 4) if wall_s else None,
+        "per_file_p50_s": percentile(list(per_file.values()), 50),
+        "per_file_p95_s": percentile(list(per_file.values()), 95),
+        "peak_rss_kb": max([self_rss_kb or 0] + child_rss) or None,
+        "stages": {
+            stage: {"count": len(walls), "p50_s": percentile(walls, 50), "p95_s": percentile(walls, 95),
+                    "total_s": round(sum(walls), 3)}
+            for stage, walls in per_stage.items()
+        },
+    }
+
+
+def compare(result, baseline, tolerance: float):
+    """Returns a list of human-readable regressions of result versus baseline."""
+    regressions = []
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        new, old = result.get(metric), baseline.get(metric)
+        if not new or not old:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def run_benchmark(args, work_dir: Path):
+    import step5_preprocess
+    import step6_core_engine
+    from run_context import RunContext
+    from run_report import self_peak_rss_kb, start_report
+
+    input_folder = work_dir / "input" / "synapse"
+    corpus = generate_corpus(input_folder, args.files, args.procs_per_file, (args.min_columns, args.max_columns),
+                             (args.min_joins, args.max_joins), args.duplicate_ratio, args.seed)
+    total_bytes = sum(p.stat().st_size for p in corpus)
+    config_path = work_dir / "config.yaml"
+    config = {
+        "dialect": "synapse",
+        "profile": None,
+        "run_validation": True,
+        "run_analyzer": True,
+        "run_transpiler": True,
+        "source_path": str(work_dir / "input"),
+        "target_path": str(work_dir / "output"),
+        "max_workers": args.workers,
+        "transpile_mode": args.transpile_mode,
+        "batch_size": args.batch_size,
+        "cache_enabled": False,
+        "format_workers": args.format_workers,
+        "upload_concurrency": args.upload_concurrency,
+        "preprocess_mode": args.preprocess_mode,
+        "transpile_backend": args.transpile_backend,
+        "worker_backend": str(ROOT_DIR / "tests" / "mock_cli" / "databricks") + ":main",
+    }
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.dump(config, f, sort_keys=False)
+
+    os.environ["PATH"] = str(ROOT_DIR / "tests" / "mock_cli") + os.pathsep + os.environ.get("PATH", "")
+    os.environ["MOCK_DATABRICKS_LATENCY"] = str(args.latency)
+    os.environ["MOCK_DATABRICKS_STARTUP"] = str(args.startup)
+    report = start_report()
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+    timings = {}
+    with quiet:
+        started = time.perf_counter()
+        step5_result = step5_preprocess.run_step5(None, config_path)
+        timings["step5_s"] = time.perf_counter() - started
+        context = RunContext.from_step5_result(step5_result, config_path)
+        started = time.perf_counter()
+        step6_core_engine.run_step6(str(config_path), force_upload=True, context=context)
+        timings["step6_s"] = time.perf_counter() - started
+        pipeline_s = timings["step5_s"] + timings["step6_s"]
+        target = work_dir / "output" / "synapse"
+        started = time.perf_counter()
+        step6_core_engine.process_sql_files(
+            target / "Converted_Code", target / "Databricks_Notebooks", target / "metadata",
+            upload_options={"force": True, "max_concurrency": args.upload_concurrency},
+            format_workers=args.format_workers,
+        )
+        timings["process_sql_files_s"] = time.perf_counter() - started
+
+    result = summarize(report.spans, {p.stem for p in corpus}, len(corpus), total_bytes, pipeline_s,
+                       self_peak_rss_kb())
+    result.update({k: round(v, 3) for k, v in timings.items()})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the accelerator against a synthetic corpus")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--procs-per-file", type=int, default=1)
+    parser.add_argument("--min-columns", type=int, default=10)
+    parser.add_argument("--max-columns", type=int, default=40)
+    parser.add_argument("--min-joins", type=int, default=1)
+    parser.add_argument("--max-joins", type=int, default=6)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every stub CLI call")
+    parser.add_argument("--startup", type=float, default=0.0, help="Seconds the stub CLI takes to load")
+    parser.add_argument("--transpile-backend", choices=["cli", "worker"], default="cli")
+    parser.add_argument("--workers", type=int, default=4, help="max_workers for transpile")
+    parser.add_argument("--transpile-mode", choices=["file", "batch"], default="file")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--format-workers", type=int, default=4)
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--preprocess-mode", choices=["memory", "stream"], default="memory")
+    parser.add_argument("--name", help="Baseline name (default derived from the corpus shape)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this result as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--work-dir", help="Keep the corpus and outputs here instead of a temp folder")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    name = args.name or (f"f{args.files}_p{args.procs_per_file}_l{args.latency}"
+                         f"_{args.transpile_mode}_w{args.workers}_{args.transpile_backend}")
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="lakebridge_bench_"))
+    try:
+        result = run_benchmark(args, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    baseline_file = BASELINE_DIR / f"{name}.json"
+    rc = 0
+    if baseline_file.exists() and not args.save_baseline:
+        with open(baseline_file, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nREGRESSION against baseline {baseline_file.name}:")
+            for line in regressions:
+                print(f"  {line}")
+            rc = 1
+        else:
+            print(f"\nNo regression against baseline {baseline_file.name}")
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline saved to {baseline_file}")
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Synthetic Synapse corpus generator for benchmarking the accelerator.
+
+Procedures are modeled on input/synapse/pop.sql: a [SCHEMA].[usp_*] procedure
+taking @SchemaName / @As_On_Date that builds DELETE and INSERT ... SELECT
+statements as quoted-string dynamic SQL and runs them with EXEC().
+
+Example:
+  python benchmarks/synthetic_corpus.py --out temp/bench/input/synapse --files 500 --procs-per-file 3
+"""
+import argparse
+import random
+from pathlib import Path
+
+ENTITIES = ["policies", "claims", "premiums", "customers", "agents", "channels", "risks", "payments",
+            "endorsements", "renewals", "brokers", "products"]
+SUFFIXES = ["fin", "daily", "monthly", "hist", "stg", "load"]
+SCHEMAS = ["GI_PROD", "GI_UAT", "LI_PROD", "HI_PROD", "DW_CORE"]
+COLUMN_WORDS = ["POLICY", "CLAIM", "CUSTOMER", "AGENT", "CHANNEL", "PRODUCT", "RISK", "PREMIUM",
+                "SUM", "OUTSTANDING", "STATUS", "START", "END", "AMOUNT", "DATE", "CODE", "NAME",
+                "NUMBER", "SCORE", "TENURE", "PAN", "BRANCH", "REGION", "CURRENCY"]
+TABLES = ["FCT_POLICY_FIN", "DIM_POLICY", "DIM_CUSTOMER", "FCT_POLICY_CLAIMS", "FCT_POLICY_RISK",
+          "DIM_AGENT", "DIM_CHANNEL", "DIM_PRODUCT", "FCT_PAYMENTS", "DIM_BRANCH"]
+
+
+def column_name(rng: random.Random):
+    return "_".join(rng.sample(COLUMN_WORDS, rng.randint(2, 3)))
+
+
+def procedure(rng: random.Random, index: int, columns: int, joins: int):
+    schema = rng.choice(SCHEMAS)
+    name = f"usp_{rng.choice(ENTITIES)}_insert_{rng.choice(SUFFIXES)}_{index}"
+    target = f"DM_{rng.choice(ENTITIES).upper()}"
+    cols = ["AS_ON_DATE"] + [column_name(rng) for _ in range(columns - 1)]
+    aliases = ["PF"] + [f"T{n}" for n in range(1, joins + 1)]
+    select_cols = ["PF.AS_ON_DATE"] + [f"{rng.choice(aliases)}.{col}" for col in cols[1:]]
+    from_lines = [f"FROM ' + @SchemaName + '.{rng.choice(TABLES)} PF"]
+    for alias in aliases[1:]:
+        from_lines.append(f"LEFT JOIN ' + @SchemaName + '.{rng.choice(TABLES)} {alias}")
+        from_lines.append(f"    ON PF.{column_name(rng)} = {alias}.{column_name(rng)}")
+        if rng.random() < 0.5:
+            from_lines.append(f"    AND {alias}.CURRENT_FLAG = ''Y''")
+    col_list = ",\n    ".join(cols)
+    select_list = ",\n    ".join(select_cols)
+    from_block = "\n".join(from_lines)
+    return f"""CREATE PROCEDURE [{schema}].[{name}]
+    @SchemaName VARCHAR(100),
+    @As_On_Date DATETIME
+AS
+BEGIN
+
+DECLARE
+    @query1 NVARCHAR(MAX),
+    @query_ins NVARCHAR(MAX),
+    @query_from NVARCHAR(MAX),
+    @query_where NVARCHAR(MAX);
+
+-- DELETE existing records for this date
+SET @query1 = '
+DELETE FROM ' + @SchemaName + '.{target}
+WHERE SOURCE_SYSTEM_NAME = ''{rng.choice(["GeneralInsuranceCore", "LifeCore", "HealthCore"])}''
+  AND AS_ON_DATE = ''' + CONVERT(VARCHAR(19), @As_On_Date, 120) + '''';
+
+EXEC(@query1);
+
+-- INSERT section
+SET @query_ins = '
+INSERT INTO ' + @SchemaName + '.{target}
+(
+    {col_list}
+)
+SELECT
+    {select_list}';
+
+-- FROM section
+SET @query_from = '
+{from_block}';
+
+-- WHERE section
+SET @query_where = '
+WHERE PF.SOURCE_SYSTEM_ID = {rng.randint(1, 99)}
+  AND PF.AS_ON_DATE = ''' + CONVERT(VARCHAR(19), @As_On_Date, 120) + '''';
+
+-- Execute final query
+EXEC(@query_ins + @query_from + @query_where);
+
+END;
+GO
+"""
+
+
+def generate_corpus(out_dir, files: int = 100, procs_per_file: int = 1, columns=(10, 40),
+                    joins=(1, 6), duplicate_ratio: float = 0.0, seed: int = 42):
+    """
+    Writes `files` scripts of `procs_per_file` GO-separated procedures into out_dir.
+    columns/joins are (min, max) ranges per procedure. duplicate_ratio of the files
+    are byte-identical copies of earlier ones, like copy-pasted procedures.
+    Returns the list of written paths.
+    """
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for n in range(files):
+        path = out_dir / f"bench_{n:06d}.sql"
+        if written and rng.random() < duplicate_ratio:
+            path.write_bytes(rng.choice(written).read_bytes())
+        else:
+            text = "\n".join(
+                procedure(rng, n * procs_per_file + p, rng.randint(*columns), rng.randint(*joins))
+                for p in range(procs_per_file)
+            )
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Synapse corpus")
+    parser.add_argument("--out", required=True, help="Output folder, e.g. input/synapse")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--procs-per-file", type=int, default=1)
+    parser.add_argument("--min-columns", type=int, default=10)
+    parser.add_argument("--max-columns", type=int, default=40)
+    parser.add_argument("--min-joins", type=int, default=1)
+    parser.add_argument("--max-joins", type=int, default=6)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    written = generate_corpus(args.out, args.files, args.procs_per_file, (args.min_columns, args.max_columns),
+                              (args.min_joins, args.max_joins), args.duplicate_ratio, args.seed)
+    total = sum(p.stat().st_size for p in written)
+    print(f"Wrote {len(written)} files ({total / (1024 * 1024):.2f} MB) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,9 @@ def postprocess(sql_text: str):
     print("[Postprocessor] Running placeholder postprocessor...")
     # Later: apply dialect-specific fixes, formatting, cleanup
     return sql_text
+
+
+def postprocess_many(texts):
+    print(f"[Postprocessor] Running placeholder postprocessor on {len(texts)} file(s)...")
+    # {file name: transpiled SQL} in, {file name: SQL} out
+    return dict(texts)
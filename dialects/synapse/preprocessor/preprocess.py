@@ -1,4 +1,120 @@
+import itertools
+import sys
+import threading
+from pathlib import Path
+
+# The rewrite engine lives with the python steps
+PY_STEPS = Path(__file__).resolve().parents[3] / "scripts" / "python_steps"
+if str(PY_STEPS) not in sys.path:
+    sys.path.insert(0, str(PY_STEPS))
+from rewrite_engine import load_rules
+from run_report import get_report
+
+RULES_FILE = Path(__file__).with_name("rules.yaml")
+
+# CONVERT style -> FORMAT pattern; the output is as wide as the pattern
+DATE_STYLES = {
+    "120": "yyyy-MM-dd HH:mm:ss",
+    "121": "yyyy-MM-dd HH:mm:ss.fff",
+    "23": "yyyy-MM-dd",
+    "112": "yyyyMMdd",
+    "101": "MM/dd/yyyy",
+    "103": "dd/MM/yyyy",
+}
+
+# T-SQL reserved keywords; a bracketed identifier spelled like one must stay bracketed
+RESERVED_WORDS = frozenset({
+    "ADD", "ALL", "ALTER", "AND", "ANY", "AS", "ASC", "AUTHORIZATION", "BACKUP", "BEGIN", "BETWEEN", "BREAK",
+    "BROWSE", "BULK", "BY", "CASCADE", "CASE", "CHECK", "CHECKPOINT", "CLOSE", "CLUSTERED", "COALESCE",
+    "COLLATE", "COLUMN", "COMMIT", "COMPUTE", "CONSTRAINT", "CONTAINS", "CONTAINSTABLE", "CONTINUE", "CONVERT",
+    "CREATE", "CROSS", "CURRENT", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "CURRENT_USER", "CURSOR",
+    "DATABASE", "DBCC", "DEALLOCATE", "DECLARE", "DEFAULT", "DELETE", "DENY", "DESC", "DISK", "DISTINCT",
+    "DISTRIBUTED", "DOUBLE", "DROP", "DUMP", "ELSE", "END", "ERRLVL", "ESCAPE", "EXCEPT", "EXEC", "EXECUTE",
+    "EXISTS", "EXIT", "EXTERNAL", "FETCH", "FILE", "FILLFACTOR", "FOR", "FOREIGN", "FREETEXT", "FREETEXTTABLE",
+    "FROM", "FULL", "FUNCTION", "GOTO", "GRANT", "GROUP", "HAVING", "HOLDLOCK", "IDENTITY", "IDENTITY_INSERT",
+    "IDENTITYCOL", "IF", "IN", "INDEX", "INNER", "INSERT", "INTERSECT", "INTO", "IS", "JOIN", "KEY", "KILL",
+    "LABEL", "LEFT", "LIKE", "LINENO", "LOAD", "MERGE", "NATIONAL", "NOCHECK", "NONCLUSTERED", "NOT", "NULL",
+    "NULLIF", "OF", "OFF", "OFFSETS", "ON", "OPEN", "OPENDATASOURCE", "OPENQUERY", "OPENROWSET", "OPENXML",
+    "OPTION", "OR", "ORDER", "OUTER", "OVER", "PERCENT", "PIVOT", "PLAN", "PRECISION", "PRIMARY", "PRINT",
+    "PROC", "PROCEDURE", "PUBLIC", "RAISERROR", "READ", "READTEXT", "RECONFIGURE", "REFERENCES", "REPLICATION",
+    "RESTORE", "RESTRICT", "RETURN", "REVERT", "REVOKE", "RIGHT", "ROLLBACK", "ROWCOUNT", "ROWGUIDCOL", "RULE",
+    "SAVE", "SCHEMA", "SECURITYAUDIT", "SELECT", "SEMANTICKEYPHRASETABLE", "SEMANTICSIMILARITYDETAILSTABLE",
+    "SEMANTICSIMILARITYTABLE", "SESSION_USER", "SET", "SETUSER", "SHUTDOWN", "SOME", "STATISTICS",
+    "SYSTEM_USER", "TABLE", "TABLESAMPLE", "TEXTSIZE", "THEN", "TO", "TOP", "TRAN", "TRANSACTION", "TRIGGER",
+    "TRUNCATE", "TRY_CONVERT", "TSEQUAL", "UNION", "UNIQUE", "UNPIVOT", "UPDATE", "UPDATETEXT", "USE", "USER",
+    "VALUES", "VARYING", "VIEW", "WAITFOR", "WHEN", "WHERE", "WHILE", "WITH", "WITHIN", "WRITETEXT"
+})
+
+# Numbers the @dynamic_sql_N variables per file, so the output depends only on the file's text
+_file_state = threading.local()
+
+
+def convert_date_style(match):
+    length, expression, style = int(match.group(1)), match.group(2), match.group(3)
+    pattern = DATE_STYLES.get(style)
+    # VARCHAR(n) truncates; only rewrite when the cut falls between two format tokens
+    if pattern is None or (length < len(pattern) and pattern[length - 1] == pattern[length]):
+        return match.group(0)
+    return f"FORMAT({expression}, '{pattern[:length]}')"
+
+
+def exec_concatenated_sql(match):
+    # BEGIN/END keeps it one statement, e.g. as the body of an IF
+    variable = f"@dynamic_sql_{next(_file_state.ids)}"
+    return f"BEGIN DECLARE {variable} NVARCHAR(MAX) = {match.group(1)}; EXEC({variable}) END"
+
+
+def unbracket_identifier(match):
+    name = match.group(1)
+    return match.group(0) if name.upper() in RESERVED_WORDS else name
+
+
+def rules():
+    return load_rules(RULES_FILE, FUNCTIONS)
+
+
+def _rewrite(rule_set, text: str, ids):
+    # ids is the file's counter; chunks of one streamed file share it
+    _file_state.ids = ids
+    try:
+        return rule_set.rewrite(text)
+    finally:
+        del _file_state.ids
+
+
 def preprocess(sql_text: str):
-    print("[Preprocessor] Running placeholder preprocessor...")
-    # Later: apply dialect-specific cleanup
-    return sql_text
+    return _rewrite(rules(), sql_text, itertools.count(1))
+
+
+def preprocess_many(texts):
+    rule_set = rules()
+    print(f"[Preprocessor] Applying {len(rule_set.rules)} rewrite rules to {len(texts)} file(s)...")
+    try:
+        processed = {}
+        for name, text in texts.items():
+            # Per-file spans, as the registry records for dialects without a batch call
+            with get_report().span("preprocess", name, len(text.encode("utf-8"))):
+                processed[name] = _rewrite(rule_set, text, itertools.count(1))
+        return processed
+    finally:
+        rule_set.flush_report()
+
+
+def preprocess_stream(chunks):
+    # Consumes and yields statement-sized chunks so large dumps never sit in memory
+    rule_set = rules()
+    ids = itertools.count(1)
+    for chunk in chunks:
+        yield _rewrite(rule_set, chunk, ids)
+
+
+def flush_report():
+    # Called once the step has streamed every file, so rule counters cover the whole run
+    rules().flush_report()
+
+
+FUNCTIONS = {
+    "convert_date_style": convert_date_style,
+    "exec_concatenated_sql": exec_concatenated_sql,
+    "unbracket_identifier": unbracket_identifier,
+}
@@ -0,0 +1,15 @@
+"""
+Lakebridge Accelerator entry point: python -m lakebridge_accelerator run
+
+Every step runs in this one process; the step scripts are imported from
+scripts/python_steps as regular modules.
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PY_STEPS = os.path.join(ROOT_DIR, "scripts", "python_steps")
+
+for _path in (PY_STEPS, ROOT_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,42 @@
+import argparse
+import sys
+
+from lakebridge_accelerator import ROOT_DIR  # noqa: F401  (puts the step scripts on sys.path)
+
+COMMANDS = {
+    "run": "Preflight, install, then steps 5 to 8 (last_full_main)",
+    "install": "Stage 1 installer: preflight, install and verify (main.py)",
+    "step6": "Core engine only (step6_core_engine)",
+    "watch": "Convert input files as they are added or changed (watch)",
+    "importtime": "Check the startup import time against its budget",
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lakebridge_accelerator",
+                                     description="Lakebridge Accelerator")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in COMMANDS.items():
+        # Arguments after the command go to the command's own parser, so each keeps its --help
+        commands.add_parser(name, help=help_text, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    # Each command imports only what it runs
+    if args.command == "run":
+        import last_full_main
+        return last_full_main.main(rest)
+    if args.command == "install":
+        import main as installer
+        return installer.main(rest)
+    if args.command == "watch":
+        import watch
+        return watch.main(rest)
+    if args.command == "step6":
+        import step6_core_engine
+        return step6_core_engine.main(rest)
+    from lakebridge_accelerator import importtime
+    return importtime.main(rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
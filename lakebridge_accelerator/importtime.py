@@ -0,0 +1,91 @@
+"""
+Startup import-time check: imports what `run` loads before its first stage in a fresh
+interpreter under -X importtime, and fails when that takes longer than the budget or
+pulls in a module that is meant to be imported only by the stage that uses it.
+"""
+import argparse
+import subprocess
+import sys
+
+from lakebridge_accelerator import ROOT_DIR
+
+# Loaded by `run` before any SQL is touched
+STARTUP_MODULES = ("lakebridge_accelerator.__main__", "last_full_main", "step5_preprocess", "step6_core_engine")
+# Imported by the stage that needs them, never at startup
+DEFERRED_MODULES = ("yaml", "sqlparse", "asyncio", "urllib.request", "openpyxl", "pyarrow", "statistics",
+                    "concurrent.futures.process")
+DEFAULT_BUDGET_MS = 150
+DEFAULT_RUNS = 3
+
+
+def parse_importtime(stderr: str):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return rows
+
+
+def measure(statement: str):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def check(budget_ms: float = DEFAULT_BUDGET_MS, runs: int = DEFAULT_RUNS, top: int = 10):
+    """
+    Returns (startup ms, slowest [(module, cumulative ms)], deferred modules that were imported).
+    Modules the bare interpreter imports anyway (site, encodings, ...) are not counted;
+    the fastest of `runs` measurements is used to keep noise out of the budget.
+    """
+    baseline = {name for name, _, _, _ in measure("pass")}
+    statement = "import " + ", ".join(STARTUP_MODULES)
+    best = None
+    for _ in range(max(runs, 1)):
+        rows = [row for row in measure(statement) if row[0] not in baseline]
+        total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+        if best is None or total_us < best[0]:
+            best = (total_us, rows)
+    total_us, rows = best
+    slowest = sorted(((name, cumulative / 1000) for name, _, cumulative, _ in rows), key=lambda item: -item[1])
+    imported = {name for name, _, _, _ in rows}
+    deferred = [name for name in DEFERRED_MODULES if name in imported]
+    return total_us / 1000, slowest[:top], deferred
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lakebridge_accelerator importtime",
+                                     description="Check the startup import time against its budget")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum startup import time in milliseconds (default {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Measurements to take; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    total_ms, slowest, deferred = check(args.budget_ms, args.runs, args.top)
+    print(f"Startup imports: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, cumulative_ms in slowest:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+    rc = 0
+    if total_ms > args.budget_ms:
+        print(f"FAIL: startup imports take {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        rc = 1
+    if deferred:
+        print(f"FAIL: imported at startup instead of by their stage: {', '.join(deferred)}")
+        rc = 1
+    if rc == 0:
+        print("PASS")
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
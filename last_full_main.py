@@ -1,41 +1,63 @@
-import subprocess
 import sys
 import os
-import importlib.util
-import yaml
+import argparse
+import importlib
+import time
+
+# The python steps import their helper modules as siblings
+PY_STEPS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "python_steps")
+if PY_STEPS not in sys.path:
+    sys.path.insert(0, PY_STEPS)
+from run_context import RunContext
+from run_report import get_report, run_measured
+import env_fingerprint
 
 # ---------------------------------------------------------------
 # Utility: run PowerShell script
 # ---------------------------------------------------------------
-def run_ps(script_path):
+def run_ps(script_path, stage="powershell"):
     print(f"\n[RUN] PowerShell Script: {script_path}")
-    completed = subprocess.run(
+    returncode, usage = run_measured(
         ["powershell", "-ExecutionPolicy", "Bypass", "-File", script_path]
     )
-    if completed.returncode != 0:
+    get_report().add(stage, os.path.basename(script_path), "ok" if returncode == 0 else f"exit {returncode}", **usage)
+    if returncode != 0:
         print(f"[ERROR] Script failed: {script_path}")
         sys.exit(1)
 
+# ---------------------------------------------------------------
+# Utility: stored fingerprint of the last full preflight, if it still matches
+# ---------------------------------------------------------------
+def preflight_fingerprint(config_file):
+    started = time.perf_counter()
+    config = env_fingerprint.read_config(config_file)
+    components = env_fingerprint.collect(config.get("profile"))
+    stored = env_fingerprint.matches(components, float(config.get("preflight_ttl_hours", env_fingerprint.DEFAULT_TTL_HOURS)))
+    get_report().add("preflight", "fingerprint", "match" if stored else "changed", wall_s=time.perf_counter() - started)
+    return stored
+
 # ---------------------------------------------------------------
 # Utility: run Python script with return value
 # ---------------------------------------------------------------
 def run_py_with_return(script_path, function_name="run", *args):
-    spec = importlib.util.spec_from_file_location("module", script_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    func = getattr(module, function_name)
+    func = getattr(load_step(script_path), function_name)
     return func(*args)
 
 # ---------------------------------------------------------------
 # Utility: run Python script without return value
 # ---------------------------------------------------------------
 def run_py(script_path, function_name="run"):
-    spec = importlib.util.spec_from_file_location("module", script_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    func = getattr(module, function_name)
+    func = getattr(load_step(script_path), function_name)
     func()
 
+# ---------------------------------------------------------------
+# Utility: import a step script once, as a regular module
+# ---------------------------------------------------------------
+def load_step(script_path):
+    # Steps live in PY_STEPS (on sys.path), so a step imported here is the same
+    # module its siblings and the package entry point import
+    return importlib.import_module(os.path.splitext(os.path.basename(script_path))[0])
+
 # ---------------------------------------------------------------
 # Path initialization (asks user and updates config.yaml)
 # ---------------------------------------------------------------
@@ -43,6 +65,7 @@ def initialize_paths(config_path):
     print("\n============================================================")
     print("Path Setup - confirm or override source/target paths")
     print("============================================================")
+    import yaml
 
     ROOT = os.path.dirname(os.path.abspath(__file__))
     guessed_source = os.path.join(ROOT, "input")
@@ -78,6 +101,40 @@ def initialize_paths(config_path):
             "run_validation": True,
             "run_analyzer": True,
             "run_transpiler": True,
+            "max_workers": 4,
+            "transpile_mode": "file",
+            "batch_size": 50,
+            "cache_enabled": True,
+            "cache_max_mb": 512,
+            "upload_concurrency": 4,
+            "upload_retries": 3,
+            "upload_backoff_seconds": 2,
+            "preprocess_mode": "memory",
+            "mmap_threshold_mb": 64,
+            "format_workers": 4,
+            "format_split_threshold_kb": 512,
+            "split_threshold_kb": 1024,
+            "split_max_parts": 16,
+            "analyzer_mode": "single",
+            "analyzer_shards": 4,
+            "scheduler": "phased",
+            "pipeline_queue_size": 64,
+            "schedule_by_cost": True,
+            "transpile_backend": "cli",
+            "worker_backend": "lakebridge",
+            "worker_python": "",
+            "command_timeout_min_s": 600,
+            "command_timeout_max_s": 21600,
+            "command_timeout_per_mb_s": 600,
+            "dedup_mode": "template",
+            "preflight_ttl_hours": 24,
+            "watch_backend": "auto",
+            "watch_debounce_ms": 1000,
+            "watch_poll_interval_s": 1,
+            "input_extensions": [".sql", ".prc", ".tsql"],
+            "input_include": [],
+            "input_exclude": [],
+            "input_recursive": True,
             "source_path": guessed_source,
             "target_path": guessed_target
         }
@@ -103,18 +160,23 @@ def initialize_paths(config_path):
 # ---------------------------------------------------------------
 # MAIN ORCHESTRATION
 # ---------------------------------------------------------------
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lakebridge Accelerator - Main Orchestrator")
+    parser.add_argument("--full-preflight", action="store_true",
+                        help="Discard the stored environment fingerprint and run preflight and "
+                             "installation even if the environment is unchanged")
+    parser.add_argument("--force-upload", action="store_true",
+                        help="Upload every notebook, ignoring the upload manifest")
+    args = parser.parse_args(argv)
 
     ROOT = os.path.dirname(os.path.abspath(__file__))
 
     PS_PREFLIGHT = f"{ROOT}/scripts/preflight/preflight_interactive.ps1"
     PS_INSTALL   = f"{ROOT}/scripts/install/install_lakebridge.ps1"
 
-    PY_STEPS = f"{ROOT}/scripts/python_steps"
-
     # Steps - 3 and 4 removed from flow
     STEP5 = f"{PY_STEPS}/step5_preprocess.py"
-    STEP6 = f"{PY_STEPS}/step6_core_engine.py"  # will be executed as separate process
+    STEP6 = f"{PY_STEPS}/step6_core_engine.py"  # runs in-process on the step 5 result
     STEP7 = f"{PY_STEPS}/step7_postprocess.py"
     STEP8 = f"{PY_STEPS}/step8_output_handler.py"
 
@@ -125,13 +187,28 @@ def main():
     print("Lakebridge Accelerator - Main Orchestrator (New Flow)")
     print("============================================================")
 
-    # STEP 1 - Preflight
-    print("\nSTEP 1 - Preflight Checks")
-    run_ps(PS_PREFLIGHT)
+    # STEPS 1 and 2 are skipped while the environment matches the last full preflight
+    stored = None
+    if args.full_preflight:
+        # Dropped up front, so a forced preflight that fails is not skipped on the next run
+        env_fingerprint.clear()
+    else:
+        stored = preflight_fingerprint(config_file)
+    if stored:
+        print(f"\nSTEP 1/2 - Environment unchanged since the full preflight of {stored['verified']}; "
+              "skipping preflight and installation (--full-preflight to force)")
+    else:
+        # STEP 1 - Preflight
+        print("\nSTEP 1 - Preflight Checks")
+        run_ps(PS_PREFLIGHT, stage="preflight")
+
+        # STEP 2 - Install Lakebridge
+        print("\nSTEP 2 - Lakebridge Installation")
+        run_ps(PS_INSTALL, stage="install")
 
-    # STEP 2 - Install Lakebridge
-    print("\nSTEP 2 - Lakebridge Installation")
-    run_ps(PS_INSTALL)
+        # Re-read after install, which may have changed the CLI or plugin version
+        config = env_fingerprint.read_config(config_file)
+        env_fingerprint.save(env_fingerprint.collect(config.get("profile")))
 
     # STEP 2.5 - Path setup & config update (new)
     print("\nSTEP 2.5 - Path Setup (confirm or override source/target)")
@@ -144,17 +221,14 @@ def main():
         print("[ERROR] Step 5 returned no data. Exiting.")
         sys.exit(1)
 
-    # STEP 6 - Core Engine (external python process)
+    # STEP 6 - Core Engine (same process, fed with the preprocessed SQL)
     print("\nSTEP 6 - Core Engine (Analyzer + Transpiler + Upload)")
 
-    cmd = [
-        sys.executable,
-        STEP6,
-        "--config",
-        config_file
-    ]
-    print(f"\n[RUN] {' '.join(cmd)}\n")
-    rc = subprocess.run(cmd).returncode
+    context = RunContext.from_step5_result(step5_result, config_file)
+    try:
+        rc = run_py_with_return(STEP6, "run_step6", config_file, args.force_upload, context)
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else 1
     if rc != 0:
         print("\n============================================================")
         print("CORE ENGINE FAILED — STOPPING PIPELINE")
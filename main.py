@@ -1,7 +1,14 @@
+import argparse
 import subprocess
 import sys
 import os
 
+# The environment fingerprint lives with the python steps
+PY_STEPS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "python_steps")
+if PY_STEPS not in sys.path:
+    sys.path.insert(0, PY_STEPS)
+import env_fingerprint
+
 # ---------------------------------------------------------------
 # ANSI Colors
 # ---------------------------------------------------------------
@@ -58,9 +65,15 @@ def verify_installation():
 # ---------------------------------------------------------------
 # MAIN ORCHESTRATION
 # ---------------------------------------------------------------
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lakebridge Accelerator - Stage 1 Installer")
+    parser.add_argument("--full-preflight", action="store_true",
+                        help="Discard the stored environment fingerprint and run preflight, installation "
+                             "and verification even if the environment is unchanged")
+    args = parser.parse_args(argv)
 
     ROOT = os.path.dirname(os.path.abspath(__file__))
+    config = env_fingerprint.read_config(os.path.join(ROOT, "config", "config.yaml"))
 
     PS_PREFLIGHT = f"{ROOT}/scripts/preflight/preflight_interactive.ps1"
     PS_INSTALL   = f"{ROOT}/scripts/install/install_lakebridge.ps1"
@@ -69,16 +82,33 @@ def main():
     print(f"{BLUE}{BOLD}Lakebridge Accelerator - Stage 1 Installer{RESET}")
     print(f"{YELLOW}{BOLD}============================================================{RESET}")
 
-    # STEP 1 - Preflight
-    print(f"\n{BLUE}{BOLD}STEP 1 - Preflight Checks{RESET}")
-    run_ps(PS_PREFLIGHT)
+    # STEPS 1-3 are skipped while the environment matches the last full preflight
+    stored = None
+    if args.full_preflight:
+        # Dropped up front, so a forced preflight that fails is not skipped on the next run
+        env_fingerprint.clear()
+    else:
+        components = env_fingerprint.collect(config.get("profile"))
+        stored = env_fingerprint.matches(
+            components, float(config.get("preflight_ttl_hours", env_fingerprint.DEFAULT_TTL_HOURS)))
+
+    if stored:
+        print(f"\n{GREEN}PASS:{RESET} Environment unchanged since the full preflight of {stored['verified']}.")
+        print(f"{CYAN}[SKIP]{RESET} Preflight, installation and verification (use --full-preflight to force).")
+    else:
+        # STEP 1 - Preflight
+        print(f"\n{BLUE}{BOLD}STEP 1 - Preflight Checks{RESET}")
+        run_ps(PS_PREFLIGHT)
+
+        # STEP 2 - Installation
+        print(f"\n{BLUE}{BOLD}STEP 2 - Lakebridge Installation{RESET}")
+        run_ps(PS_INSTALL)
 
-    # STEP 2 - Installation
-    print(f"\n{BLUE}{BOLD}STEP 2 - Lakebridge Installation{RESET}")
-    run_ps(PS_INSTALL)
+        # STEP 3 - Verify Installation
+        verify_installation()
 
-    # STEP 3 - Verify Installation
-    verify_installation()
+        # Collected after install, which may have changed the CLI or plugin version
+        env_fingerprint.save(env_fingerprint.collect(config.get("profile")))
 
     # STEP 4 - Complete
     print(f"\n{YELLOW}{BOLD}============================================================{RESET}")
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import re
+import sys
+from itertools import chain
+from pathlib import Path
+
+# Header cells (lower-cased) that name the source script of a report row
+FILE_COLUMNS = {"file", "file name", "filename", "file_name", "file path", "path", "source file",
+                "program", "program name", "script", "script name"}
+STATUS_COLUMNS = {"status", "parse status", "analysis status", "error"}
+HEADER_SCAN_ROWS = 10
+
+# Per-file metrics pulled from the "SQL Programs" and "Functions by Script" sheets
+METRIC_COLUMNS = ["file", "source_file", "report", "line_count", "complexity", "statement_count",
+                  "procedure_count", "function_calls", "loops", "medium_breaks", "high_breaks", "issues"]
+PROGRAM_HEADERS = {
+    "program name": "file",
+    "source file": "source_file",
+    "line count": "line_count",
+    "complexity": "complexity",
+    "statement count": "statement_count",
+    "procedure and function counts": "procedure_count",
+    "categorization metrics": "categorization",
+}
+CATEGORIZATION_COUNTS = {"Loops": "loops", "Medium category breaks": "medium_breaks",
+                         "High category breaks": "high_breaks"}
+
+
+def _load_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        return None
+    return openpyxl
+
+
+def _find_header(rows):
+    """Returns (header row index, file column, status column or None) within the first rows."""
+    for index, row in enumerate(rows):
+        cells = [str(cell).strip().lower() if cell is not None else "" for cell in row]
+        file_col = next((n for n, cell in enumerate(cells) if cell in FILE_COLUMNS), None)
+        if file_col is not None:
+            status_col = next((n for n, cell in enumerate(cells) if cell in STATUS_COLUMNS), None)
+            return index, file_col, status_col
+    return None
+
+
+def row_status(value):
+    text = str(value or "").strip().lower()
+    return "Failed" if "fail" in text or "error" in text else "Success"
+
+
+def read_file_statuses(report_file: Path, file_names):
+    """
+    Reads the analyzer report and returns {file name: "Success"/"Failed"/"Missing"} for
+    file_names, based on the rows that mention each file (by base name). Returns None
+    when the report cannot be read or no sheet has a recognizable file column, so the
+    caller can fall back to the analyzer exit code.
+    """
+    openpyxl = _load_openpyxl()
+    if openpyxl is None or not Path(report_file).exists():
+        return None
+    try:
+        workbook = openpyxl.load_workbook(report_file, read_only=True, data_only=True)
+    except Exception:
+        return None
+    wanted = {Path(name).name.lower(): name for name in file_names}
+    wanted.update({Path(name).stem.lower(): name for name in file_names})
+    statuses = {}
+    found_column = False
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            head = []
+            for row in rows:
+                head.append(row)
+                if len(head) >= HEADER_SCAN_ROWS:
+                    break
+            header = _find_header(head)
+            if header is None:
+                continue
+            found_column = True
+            index, file_col, status_col = header
+            for row in chain(head[index + 1:], rows):
+                if file_col >= len(row) or row[file_col] is None:
+                    continue
+                key = Path(str(row[file_col]).replace("\\", "/")).name.lower()
+                name = wanted.get(key) or wanted.get(Path(key).stem)
+                if name is None:
+                    continue
+                status = row_status(row[status_col]) if status_col is not None and status_col < len(row) else "Success"
+                if statuses.get(name) != "Failed":
+                    statuses[name] = status
+    finally:
+        workbook.close()
+    if not found_column:
+        return None
+    return {name: statuses.get(name, "Missing") for name in file_names}
+
+
+def merge_reports(shard_reports, out_file: Path):
+    """
+    Merges per-shard analyzer workbooks into out_file: sheets with the same name are
+    concatenated, keeping the header rows of the first shard only. Returns False if
+    openpyxl is unavailable or no shard report could be read.
+    """
+    openpyxl = _load_openpyxl()
+    if openpyxl is None:
+        return False
+    merged = openpyxl.Workbook(write_only=True)
+    sheets = {}
+    pending = {}
+    merged_any = False
+    for report in shard_reports:
+        try:
+            # Formulas (e.g. the Summary COUNTIFS over SQL Programs) are kept so they cover the merged rows
+            workbook = openpyxl.load_workbook(report, read_only=True)
+        except Exception:
+            continue
+        merged_any = True
+        try:
+            for sheet in workbook.worksheets:
+                rows = list(sheet.iter_rows(values_only=True))
+                if sheet.title not in sheets:
+                    sheets[sheet.title] = merged.create_sheet(sheet.title)
+                    pending[sheet.title] = rows
+                    continue
+                header = _find_header(rows[:HEADER_SCAN_ROWS])
+                # Without a recognizable header the sheet is a per-shard summary; keep the first one
+                if header is not None:
+                    pending[sheet.title].extend(rows[header[0] + 1:])
+        finally:
+            workbook.close()
+    if not merged_any:
+        return False
+    for title, rows in pending.items():
+        for row in rows:
+            sheets[title].append(row)
+    merged.save(out_file)
+    return True
+
+
+def _base_name(value):
+    return Path(str(value).replace("\\", "/")).name
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _header_map(row, headers):
+    cells = [str(cell).strip().lower() if cell is not None else "" for cell in row]
+    return {headers[cell]: n for n, cell in enumerate(cells) if cell in headers}
+
+
+def read_program_metrics(report_file: Path):
+    """
+    Streams the per-file metrics out of an analyzer workbook in read-only mode, without
+    loading whole sheets. Returns columns {name: [values]} laid out as METRIC_COLUMNS.
+    """
+    openpyxl = _load_openpyxl()
+    columns = {name: [] for name in METRIC_COLUMNS}
+    if openpyxl is None:
+        return columns
+    workbook = openpyxl.load_workbook(report_file, read_only=True, data_only=True)
+    try:
+        function_calls = {}
+        if "Functions by Script" in workbook.sheetnames:
+            rows = workbook["Functions by Script"].iter_rows(values_only=True)
+            header = _header_map(next(rows, ()), {"script": "script", "# of calls": "calls"})
+            if len(header) == 2:
+                for row in rows:
+                    script = row[header["script"]] if header["script"] < len(row) else None
+                    if script:
+                        name = _base_name(script)
+                        function_calls[name] = function_calls.get(name, 0) + _to_int(row[header["calls"]])
+        if "SQL Programs" not in workbook.sheetnames:
+            return columns
+        header = None
+        for row in workbook["SQL Programs"].iter_rows(values_only=True):
+            if header is None:
+                found = _header_map(row, PROGRAM_HEADERS)
+                if "file" in found or "source_file" in found:
+                    header = found
+                continue
+            value = lambda key: row[header[key]] if key in header and header[key] < len(row) else None
+            name = _base_name(value("source_file") or value("file") or "")
+            if not name:
+                continue
+            counts = {column: 0 for column in CATEGORIZATION_COUNTS.values()}
+            for label, column in CATEGORIZATION_COUNTS.items():
+                match = re.search(re.escape(label) + r":\s*(\d+)", str(value("categorization") or ""))
+                counts[column] = int(match.group(1)) if match else 0
+            columns["file"].append(name)
+            columns["source_file"].append(str(value("source_file") or ""))
+            columns["report"].append(Path(report_file).name)
+            columns["line_count"].append(_to_int(value("line_count")))
+            columns["complexity"].append(str(value("complexity") or ""))
+            columns["statement_count"].append(_to_int(value("statement_count")))
+            columns["procedure_count"].append(_to_int(value("procedure_count")))
+            columns["function_calls"].append(function_calls.get(name, 0))
+            for column, count in counts.items():
+                columns[column].append(count)
+            columns["issues"].append(counts["medium_breaks"] + counts["high_breaks"])
+    finally:
+        workbook.close()
+    return columns
+
+
+def _write_columns(columns, cache_file: Path):
+    # Parquet when pyarrow is installed, otherwise the same columns as compact JSON arrays
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(pyarrow.Table.from_pydict(columns), cache_file.with_suffix(".parquet"))
+        return cache_file.with_suffix(".parquet")
+    except ImportError:
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(columns, f, separators=(",", ":"))
+        os.replace(tmp_file, cache_file.with_suffix(".json"))
+        return cache_file.with_suffix(".json")
+
+
+def _read_columns(cache_file: Path):
+    parquet_file = cache_file.with_suffix(".parquet")
+    json_file = cache_file.with_suffix(".json")
+    try:
+        if parquet_file.exists():
+            import pyarrow.parquet
+            return pyarrow.parquet.read_table(parquet_file).to_pydict()
+        if json_file.exists():
+            with open(json_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except (ImportError, OSError, ValueError):
+        pass
+    return None
+
+
+def load_report_metrics(report_file: Path, cache_dir: Path):
+    """
+    Returns the METRIC_COLUMNS of one report, parsing the workbook only the first time:
+    the columns are cached under cache_dir keyed by report name and path, size and mtime.
+    """
+    report_file = Path(report_file)
+    stat = report_file.stat()
+    # Reports of the same name in other folders (or shard copies) get entries of their own
+    prefix = f"{report_file.stem}_{hashlib.sha256(str(report_file.resolve()).encode('utf-8')).hexdigest()[:12]}"
+    cache_file = Path(cache_dir) / f"{prefix}_{stat.st_size}_{stat.st_mtime_ns}"
+    columns = _read_columns(cache_file)
+    if columns is None:
+        columns = read_program_metrics(report_file)
+        if _load_openpyxl() is None:
+            # The workbook was not read; caching its empty columns would hide its metrics for good
+            return columns
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        stale_name = re.compile(rf"{re.escape(prefix)}_\d+_\d+\.\w+")
+        for stale in Path(cache_dir).glob(f"{prefix}_*"):
+            if stale_name.fullmatch(stale.name):
+                stale.unlink()
+        _write_columns(columns, cache_file)
+    return columns
+
+
+def find_reports(folders):
+    """Analyzer workbooks under folders (recursively), oldest first; Excel lock files are skipped."""
+    reports = []
+    for folder in folders:
+        if Path(folder).is_dir():
+            reports += [p for p in Path(folder).rglob("*.xlsx") if not p.name.startswith("~$")]
+    return sorted(reports, key=lambda p: p.stat().st_mtime)
+
+
+def metrics_by_file(folders, cache_dir: Path):
+    """{file name: metrics row} across every report under folders; newer reports win."""
+    rows = {}
+    for report in find_reports(folders):
+        try:
+            columns = load_report_metrics(report, cache_dir)
+        except Exception as e:
+            print(f"Skipping unreadable analyzer report {report}: {e}", file=sys.stderr)
+            continue
+        for n, name in enumerate(columns.get("file", [])):
+            rows[name] = {column: columns[column][n] for column in METRIC_COLUMNS}
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert analyzer reports into the columnar metrics cache")
+    parser.add_argument("folders", nargs="+", help="Folders holding lakebridge_analysis_*.xlsx reports")
+    parser.add_argument("--cache-dir", required=True, help="Where the per-report column files are kept")
+    args = parser.parse_args()
+    metrics = metrics_by_file(args.folders, Path(args.cache_dir))
+    print(f"{len(metrics)} file(s) with analyzer metrics")
+    for name, row in sorted(metrics.items()):
+        print(f"  {name}: {row['complexity']}, {row['line_count']} lines, {row['issues']} issue(s)")
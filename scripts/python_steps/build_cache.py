@@ -0,0 +1,153 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+
+def sha256_text(text: str):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: Path):
+    if not path.exists():
+        return "missing"
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_lakebridge_version():
+    """
+    Returns the databricks CLI version plus the installed lakebridge plugin version.
+    Looked up once per process, so repeated runs in a warm process don't start the CLI again.
+    """
+    parts = []
+    for cmd in (["databricks", "--version"], ["databricks", "labs", "installed"]):
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=120)
+        except (OSError, subprocess.TimeoutExpired):
+            parts.append("unknown")
+            continue
+        lines = result.stdout.splitlines()
+        if cmd[-1] == "installed":
+            lines = [line for line in lines if "lakebridge" in line.lower()]
+        parts.append(" ".join(" ".join(lines).split()) or "unknown")
+    return " | ".join(parts)
+
+
+def cache_key(sql_text: str, dialect: str, cli_version: str, preprocessor_hash: str, file_name: str = ""):
+    # The file name is part of the key because generated notebooks embed it
+    h = hashlib.sha256()
+    for part in (dialect, cli_version, preprocessor_hash, file_name):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(sql_text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Persistent content-addressed cache of converted, formatted and notebook outputs.
+
+    Layout: <cache_dir>/index.json plus <cache_dir>/entries/<key>/<artifact>.
+    Entries are evicted least-recently-used first once max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 512 * 1024 * 1024, max_entries: int = 100000):
+        self.cache_dir = Path(cache_dir)
+        self.entries_dir = self.cache_dir / "entries"
+        self.index_file = self.cache_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if not self.index_file.exists():
+            return {}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        tmp_file = self.index_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp_file, self.index_file)
+
+    def lookup(self, key: str):
+        """Returns the entry metadata on a hit (and marks it recently used), else None."""
+        entry = self.index.get(key)
+        if entry is None or not (self.entries_dir / key).is_dir():
+            self.index.pop(key, None)
+            self.misses += 1
+            return None
+        entry["last_used"] = time.time()
+        self.hits += 1
+        return entry
+
+    def restore(self, key: str, artifacts: dict):
+        """Copies the cached artifacts of an entry to the given {artifact name: destination path}.
+
+        Identical sources share one entry, so destinations are chosen by the caller.
+        An optional artifact the entry does not hold is removed at its destination, so an
+        output left by an earlier build (e.g. a source map) does not outlive it.
+        """
+        cached = self.index.get(key, {}).get("files", {})
+        for artifact, dest in artifacts.items():
+            dest = Path(dest)
+            if artifact not in cached:
+                dest.unlink(missing_ok=True)
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(self.entries_dir / key / artifact, dest)
+
+    def store(self, key: str, source_name: str, artifacts: dict, analyzer_status: str = "Success", optional=()):
+        """
+        artifacts maps an artifact name (e.g. "converted") to the produced file path.
+        Artifacts named in optional are stored only when the build produced them.
+        """
+        entry_dir = self.entries_dir / key
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        files = {}
+        size = 0
+        for artifact, path in artifacts.items():
+            path = Path(path)
+            if artifact in optional and not path.exists():
+                (entry_dir / artifact).unlink(missing_ok=True)
+                continue
+            shutil.copy2(path, entry_dir / artifact)
+            files[artifact] = path.name
+            size += path.stat().st_size
+        self.index[key] = {
+            "source": source_name,
+            "files": files,
+            "size": size,
+            "analyzer_status": analyzer_status,
+            "last_used": time.time(),
+        }
+        self.stores += 1
+
+    def evict(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes and len(self.index) <= self.max_entries:
+                break
+            total -= self.index.pop(key)["size"]
+            shutil.rmtree(self.entries_dir / key, ignore_errors=True)
+            self.evicted += 1
+
+    def stats_line(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        return (
+            f"Build cache: {self.hits} hits, {self.misses} misses, {self.stores} stored, "
+            f"{self.evicted} evicted, {len(self.index)} entries, {total / (1024 * 1024):.1f} MB"
+        )
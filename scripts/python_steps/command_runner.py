@@ -0,0 +1,250 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from run_report import _windows_usage
+
+RING_BUFFER_BYTES = 64 * 1024
+# How long the pipes may stay open after the command exits (a grandchild holding them)
+DRAIN_GRACE_S = 5.0
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+class RingBuffer:
+    """Keeps the last max_bytes of a stream, chunk by chunk."""
+
+    def __init__(self, max_bytes: int = RING_BUFFER_BYTES):
+        self.max_bytes = max_bytes
+        self.chunks = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def append(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size > self.max_bytes and len(self.chunks) > 1:
+            self.size -= len(self.chunks.popleft())
+            self.dropped += 1
+
+    def text(self):
+        return b"".join(self.chunks).decode("utf-8", errors="replace")
+
+
+@dataclass
+class CommandResult:
+    """Outcome of one command; truthy when it exited with code 0."""
+    argv: list
+    returncode: int = None
+    stdout: str = ""
+    stderr: str = ""
+    wall_s: float = None
+    cpu_s: float = None
+    peak_rss_kb: int = None
+    timeout_s: float = None
+    timed_out: bool = False
+    cancelled: bool = False
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def status(self):
+        if self.timed_out:
+            return "timeout"
+        if self.cancelled:
+            return "cancelled"
+        return "ok" if self.returncode == 0 else f"exit {self.returncode}"
+
+    def error_summary(self):
+        """Last non-empty line of stderr (or stdout), for logs and the summary CSV."""
+        if self.ok:
+            return ""
+        for text in (self.stderr, self.stdout):
+            lines = [line.strip() for line in text.splitlines() if line.strip()]
+            if lines:
+                return lines[-1][:300]
+        return self.status
+
+
+class AdaptiveTimeout:
+    """
+    Per-command timeout scaled to the input size. Until enough commands have finished
+    it allows min_s plus per_mb_s per MB; afterwards factor times the slowest observed
+    seconds-per-byte. Always clamped to [min_s, max_s].
+    """
+
+    def __init__(self, min_s: float = 600, max_s: float = 21600, per_mb_s: float = 600, factor: float = 10,
+                 min_samples: int = 5):
+        self.min_s = min_s
+        self.max_s = max_s
+        self.per_mb_s = per_mb_s
+        self.factor = factor
+        self.min_samples = min_samples
+        self._rates = []
+        self._lock = threading.Lock()
+
+    def observe(self, size_bytes, wall_s):
+        if size_bytes and wall_s:
+            with self._lock:
+                self._rates.append(wall_s / size_bytes)
+
+    def timeout(self, size_bytes=None):
+        if not size_bytes:
+            return self.max_s
+        with self._lock:
+            rates = list(self._rates)
+        if len(rates) >= self.min_samples:
+            seconds = self.factor * max(rates) * size_bytes
+        else:
+            seconds = self.min_s + self.per_mb_s * size_bytes / (1024 * 1024)
+        return min(self.max_s, max(self.min_s, seconds))
+
+
+def kill_tree(proc):
+    """Kills the process and everything it started (its process group / job tree)."""
+    if sys.platform == "win32":
+        if proc.poll() is None:
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    # No poll()/wait() here: the child is reaped by _wait with os.wait4
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def cancel_all():
+    """Kills every command still running, e.g. when the run is interrupted."""
+    with _running_lock:
+        procs = list(_running)
+    for proc in procs:
+        kill_tree(proc)
+
+
+def resolve(argv):
+    # Without a shell, the executable (e.g. databricks.exe / .cmd) is looked up here
+    executable = shutil.which(argv[0])
+    return [executable or argv[0]] + [str(arg) for arg in argv[1:]]
+
+
+def _drain(pipe, ring: RingBuffer):
+    # One blocking reader per pipe, so a full stderr can never stall stdout (or the reverse)
+    with pipe:
+        for chunk in iter(lambda: pipe.read1(8192), b""):
+            ring.append(chunk)
+
+
+def _start_drain(loop, pipe, ring: RingBuffer):
+    # A daemon thread rather than the loop's executor: a reader blocked on a pipe a
+    # grandchild still holds is abandoned instead of stalling the loop's shutdown
+    future = loop.create_future()
+
+    def _done():
+        if not future.done():
+            future.set_result(None)
+
+    def _run():
+        try:
+            _drain(pipe, ring)
+        finally:
+            try:
+                loop.call_soon_threadsafe(_done)
+            except RuntimeError:
+                pass  # the command already returned and its loop is closed
+
+    threading.Thread(target=_run, daemon=True).start()
+    return future
+
+
+def _wait(proc):
+    # Reaps the child ourselves so its rusage (CPU, peak RSS) is not lost
+    if sys.platform == "win32":
+        proc.wait()
+        try:
+            return _windows_usage(proc._handle)
+        except Exception:
+            return None, None
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    peak = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    return rusage.ru_utime + rusage.ru_stime, peak
+
+
+async def run_async(argv, timeout=None, cwd=None, env=None, max_output: int = RING_BUFFER_BYTES):
+    """
+    Runs argv (no shell) and captures stdout and stderr concurrently into ring buffers.
+    On timeout or cancellation the whole process tree is killed. Returns a CommandResult.
+    """
+    import asyncio
+    argv = resolve(argv)
+    result = CommandResult(argv=argv, timeout_s=timeout)
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    popen_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if sys.platform == "win32" \
+        else {"start_new_session": True}
+    proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            cwd=cwd, env=env, **popen_kwargs)
+    with _running_lock:
+        _running.add(proc)
+    out, err = RingBuffer(max_output), RingBuffer(max_output)
+    pumps = [_start_drain(loop, proc.stdout, out), _start_drain(loop, proc.stderr, err)]
+    waiter = loop.run_in_executor(None, _wait, proc)
+    try:
+        result.cpu_s, result.peak_rss_kb = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+    except asyncio.TimeoutError:
+        result.timed_out = True
+    except asyncio.CancelledError:
+        result.cancelled = True
+    finally:
+        if result.timed_out or result.cancelled:
+            kill_tree(proc)
+            result.cpu_s, result.peak_rss_kb = await waiter
+        with _running_lock:
+            _running.discard(proc)
+        _, pending = await asyncio.wait(pumps, timeout=DRAIN_GRACE_S)
+        if pending:
+            # Something the command started still holds the pipes; its process group goes too
+            kill_tree(proc)
+            _, pending = await asyncio.wait(pending, timeout=DRAIN_GRACE_S)
+        for pump in pending:
+            # Output read so far is kept; the reader thread ends with the last writer
+            pump.cancel()
+        result.returncode = proc.returncode
+        result.wall_s = time.perf_counter() - started
+        result.stdout, result.stderr = out.text(), err.text()
+    return result
+
+
+def run_command(argv, timeout=None, **kwargs):
+    """Synchronous entry point for run_async; safe to call from worker threads."""
+    # asyncio is imported on the first command rather than at startup
+    import asyncio
+    return asyncio.run(run_async(argv, timeout, **kwargs))
+
+
+_timeouts = AdaptiveTimeout()
+
+
+def get_timeouts():
+    """The AdaptiveTimeout shared by every command of this run."""
+    return _timeouts
+
+
+def configure_timeouts(**options):
+    global _timeouts
+    _timeouts = AdaptiveTimeout(**options)
+    return _timeouts
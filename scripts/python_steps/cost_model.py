@@ -0,0 +1,84 @@
+import csv
+from pathlib import Path
+from statistics import median
+
+# Relative transpile cost per analyzer complexity class, before any history is seen
+COMPLEXITY_WEIGHTS = {"LOW": 1.0, "MEDIUM": 2.0, "COMPLEX": 4.0, "VERY_COMPLEX": 8.0}
+MIN_CLASS_SAMPLES = 3
+
+
+class CostModel:
+    """
+    Predicts the transpile time of a file from its size and analyzer complexity class,
+    calibrated with the per-file transpile spans of earlier runs (run_report_*.csv).
+    A file seen before is predicted from its own last timing, scaled by size.
+    """
+
+    def __init__(self, metrics=None, history=None):
+        self.metrics = metrics or {}
+        self.history = history or {}
+        self.seconds_per_byte, self.weights = self._fit()
+
+    @classmethod
+    def from_metadata(cls, metadata_root: Path, metrics=None, max_reports: int = 20):
+        """Builds the model from the newest max_reports run reports under metadata/<date>/."""
+        reports = sorted(Path(metadata_root).glob("*/run_report_*.csv"), key=lambda p: p.name, reverse=True)
+        history = {}
+        for report in reports[:max_reports]:
+            try:
+                with open(report, "r", encoding="utf-8", newline="") as f:
+                    for span in csv.DictReader(f):
+                        name = span.get("name", "")
+                        # Only single-file spans ("Transpile x.sql") say what one file cost
+                        if span.get("stage") != "transpile" or span.get("status") != "ok" \
+                                or not name.startswith("Transpile ") or not name.endswith(".sql"):
+                            continue
+                        file_name = name[len("Transpile "):]
+                        if file_name not in history and span.get("wall_s") and span.get("size_bytes"):
+                            history[file_name] = (float(span["wall_s"]), int(float(span["size_bytes"])))
+            except (OSError, ValueError):
+                continue
+        return cls(metrics, history)
+
+    def _complexity(self, name: str):
+        return str(self.metrics.get(name, {}).get("complexity") or "LOW").upper()
+
+    def _fit(self):
+        weights = dict(COMPLEXITY_WEIGHTS)
+        samples = [(wall, size, self._complexity(name)) for name, (wall, size) in self.history.items() if size]
+        if not samples:
+            return 1e-6, weights
+        rate = median(wall / (size * weights.get(cls, 1.0)) for wall, size, cls in samples) or 1e-6
+        by_class = {}
+        for wall, size, cls in samples:
+            by_class.setdefault(cls, []).append(wall / (size * rate))
+        for cls, ratios in by_class.items():
+            if len(ratios) >= MIN_CLASS_SAMPLES:
+                weights[cls] = median(ratios)
+        return rate, weights
+
+    def predict(self, sql_file: Path):
+        """Predicted transpile seconds for sql_file."""
+        size = sql_file.stat().st_size
+        if sql_file.name in self.history:
+            wall, seen_size = self.history[sql_file.name]
+            return wall * (size / seen_size if seen_size else 1.0)
+        return size * self.seconds_per_byte * self.weights.get(self._complexity(sql_file.name), 1.0)
+
+    def order(self, sql_files):
+        """Largest predicted cost first, so a worker pool never starts the biggest file last (LPT)."""
+        return sorted(sql_files, key=self.predict, reverse=True)
+
+    def pack(self, sql_files, batch_size: int):
+        """
+        Bin-packs files into ceil(n / batch_size) batches of at most batch_size files and
+        similar predicted cost, placing the largest files first; the costliest batch comes first.
+        """
+        count = max(1, -(-len(sql_files) // max(1, batch_size)))
+        bins = [[0.0, []] for _ in range(count)]
+        for sql_file in self.order(sql_files):
+            open_bins = [b for b in bins if len(b[1]) < batch_size]
+            target = min(open_bins, key=lambda b: b[0])
+            target[0] += self.predict(sql_file)
+            target[1].append(sql_file)
+        return [files for _, files in sorted(bins, key=lambda b: b[0], reverse=True) if files]
@@ -0,0 +1,197 @@
+import hashlib
+import re
+from pathlib import Path
+
+TOKEN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>N?'(?:[^']|'')*')
+  | (?P<bracket>\[[^\]\n]*\])
+  | (?P<number>\b\d+(?:\.\d+)?\b)
+  | (?P<variable>@@?\w+)
+  | (?P<word>[A-Za-z_#][\w$#]*)
+  | (?P<space>\s+)
+  | (?P<other>.)
+""", re.S | re.X)
+
+# Words kept as-is in the template fingerprint; any other word is an identifier
+KEYWORDS = {
+    "ADD", "ALL", "ALTER", "AND", "ANY", "AS", "ASC", "BEGIN", "BETWEEN", "BREAK", "BY", "CASE", "CATCH",
+    "CLOSE", "COMMIT", "CONTINUE", "CREATE", "CROSS", "CURSOR", "DEALLOCATE", "DECLARE", "DEFAULT", "DELETE",
+    "DESC", "DISTINCT", "DROP", "ELSE", "END", "EXCEPT", "EXEC", "EXECUTE", "EXISTS", "FETCH", "FOR", "FROM",
+    "FULL", "FUNCTION", "GO", "GOTO", "GROUP", "HAVING", "IF", "IN", "INDEX", "INNER", "INSERT", "INTERSECT",
+    "INTO", "IS", "JOIN", "KEY", "LEFT", "LIKE", "MERGE", "NEXT", "NOCOUNT", "NOT", "NULL", "OF", "OFF", "ON",
+    "OPEN", "OR", "ORDER", "OUTER", "OUTPUT", "OVER", "PARTITION", "PRIMARY", "PROC", "PROCEDURE", "RAISERROR",
+    "RETURN", "RETURNS", "RIGHT", "ROLLBACK", "ROWS", "SELECT", "SET", "TABLE", "THEN", "THROW", "TOP", "TRAN",
+    "TRANSACTION", "TRUNCATE", "TRY", "UNION", "UPDATE", "USING", "VALUES", "VIEW", "WHEN", "WHERE", "WHILE",
+    "WITH", "BIGINT", "BIT", "CHAR", "DATE", "DATETIME", "DATETIME2", "DECIMAL", "FLOAT", "INT", "MAX",
+    "MONEY", "NCHAR", "NUMERIC", "NVARCHAR", "REAL", "SMALLINT", "TIME", "TINYINT", "VARCHAR",
+}
+VALUE_KINDS = ("comment", "string", "bracket", "number", "variable", "word")
+# Names the transpiler may rewrite wherever they appear (types, date parts, niladic
+# functions), so a duplicate's value spelled like one cannot be pasted into reused output
+REWRITTEN_NAMES = KEYWORDS | {
+    "BINARY", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "CURRENT_USER", "DATETIMEOFFSET", "GEOGRAPHY",
+    "GEOMETRY", "HIERARCHYID", "IMAGE", "NTEXT", "ROWVERSION", "SESSION_USER", "SMALLDATETIME", "SMALLMONEY",
+    "SQL_VARIANT", "SYSNAME", "SYSTEM_USER", "TEXT", "TIMESTAMP", "UNIQUEIDENTIFIER", "USER", "VARBINARY", "XML",
+    "YEAR", "YY", "YYYY", "QUARTER", "QQ", "Q", "MONTH", "MM", "M", "DAYOFYEAR", "DY", "Y", "DAY", "DD", "D",
+    "WEEK", "WK", "WW", "WEEKDAY", "DW", "W", "HOUR", "HH", "MINUTE", "MI", "N", "SECOND", "SS", "S",
+    "MILLISECOND", "MS", "MICROSECOND", "MCS", "NANOSECOND", "NS", "ISO_WEEK", "ISOWK", "ISOWW", "TZOFFSET", "TZ",
+}
+PLAIN_NAME = re.compile(r"[A-Za-z_][\w$]*")
+IDENTIFIER_BOUNDARY = r"(?<![\w@#$]){}(?![\w$#])"
+
+
+def tokenize(sql_text: str):
+    """(kind, text) tokens, without whitespace. Function names (a word before '(') count as keywords."""
+    tokens = [(m.lastgroup, m.group()) for m in TOKEN.finditer(sql_text) if m.lastgroup != "space"]
+    for n, (kind, text) in enumerate(tokens):
+        if kind == "word" and (text.upper() in KEYWORDS or (n + 1 < len(tokens) and tokens[n + 1][1] == "(")):
+            tokens[n] = ("keyword", text)
+    return tokens
+
+
+def template(sql_text: str):
+    """
+    (fingerprint, slots): identifiers, variables, literals and comments are replaced by
+    numbered placeholders, numbered by first occurrence, so two files share a fingerprint
+    when they differ only in those values (and repeat them in the same places).
+    slots lists the distinct values in placeholder order.
+    """
+    h = hashlib.sha256()
+    slots = {}
+    for kind, text in tokenize(sql_text):
+        if kind in VALUE_KINDS:
+            # Brackets are compared by name, since the transpiler drops them
+            value = (kind, text[1:-1] if kind == "bracket" else text)
+            text = f"\0{kind}{slots.setdefault(value, len(slots))}"
+        h.update(text.encode("utf-8") + b"\1")
+    return h.hexdigest(), list(slots)
+
+
+def _value_pattern(kind: str, value: str):
+    if kind in ("word", "variable", "bracket", "number"):
+        return IDENTIFIER_BOUNDARY.format(re.escape(value))
+    return re.escape(value)
+
+
+def _safe_swap(kind: str, rep_value: str, dup_value: str):
+    """
+    True when dup_value can be pasted where the transpiler kept rep_value: a number,
+    variable, comment or plain string literal, or a plain name the transpiler does not
+    rewrite (a #temp name only in place of another #temp name).
+    """
+    if kind in ("number", "variable", "comment"):
+        return True
+    if kind == "string":
+        return dup_value.startswith("'") and rep_value.startswith("'")
+    name = dup_value[1:] if dup_value.startswith("#") and rep_value.startswith("#") else dup_value
+    return PLAIN_NAME.fullmatch(name) is not None and name.upper() not in REWRITTEN_NAMES
+
+
+def _squash(sql_text: str):
+    return re.sub(r"\s+", " ", sql_text).strip()
+
+
+def reinstantiate(rep_input: str, rep_output: str, dup_input: str):
+    """
+    Turns the representative's transpiled output into the duplicate's by swapping every
+    value that differs between the two inputs. Returns None when that is not safe: every
+    duplicate value must be one the transpiler leaves alone (see _safe_swap), the swap
+    must turn the representative's input into the duplicate's, and every swapped value
+    must appear in the output as often as in the input (otherwise the transpiler
+    rewrote it and the duplicate has to be transpiled on its own).
+    """
+    rep_key, rep_slots = template(rep_input)
+    dup_key, dup_slots = template(dup_input)
+    if rep_key != dup_key:
+        return None
+    swaps = {rep_value: dup_value for (kind, rep_value), (_, dup_value) in zip(rep_slots, dup_slots)
+             if rep_value != dup_value}
+    if not swaps:
+        return rep_output
+    if not all(_safe_swap(kind, rep_value, swaps[rep_value]) for kind, rep_value in rep_slots if rep_value in swaps):
+        return None
+    kinds = {rep_value: kind for kind, rep_value in rep_slots if rep_value in swaps}
+    # Longest first, so a value is never matched as part of a longer one
+    pattern = re.compile("|".join(_value_pattern(kinds[value], value)
+                                  for value in sorted(swaps, key=len, reverse=True)))
+
+    def _counts(text):
+        counts = {}
+        for m in pattern.finditer(text):
+            counts[m.group()] = counts.get(m.group(), 0) + 1
+        return counts
+
+    if _counts(rep_input) != _counts(rep_output):
+        return None
+    if _squash(pattern.sub(lambda m: swaps[m.group()], rep_input)) != _squash(dup_input):
+        return None
+    return pattern.sub(lambda m: swaps[m.group()], rep_output)
+
+
+class DedupPlan:
+    """
+    Equivalence classes of the files to transpile: byte-identical files, and (with
+    templates) files that differ only in identifiers and literals. The first file of
+    each class is its representative; only representatives are transpiled.
+    """
+
+    def __init__(self, sql_files, templates: bool = True):
+        self.files = {sql_file.name: sql_file for sql_file in sql_files}
+        self.duplicates = {}
+        self.kind = {}
+        exact = {}
+        by_template = {}
+        for sql_file in sql_files:
+            data = sql_file.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in exact:
+                self.duplicates[sql_file.name] = exact[digest]
+                self.kind[sql_file.name] = "exact"
+                continue
+            exact[digest] = sql_file.name
+            if templates:
+                key, _ = template(data.decode("utf-8", errors="replace"))
+                if key in by_template:
+                    self.duplicates[sql_file.name] = by_template[key]
+                    self.kind[sql_file.name] = "template"
+                    continue
+                by_template[key] = sql_file.name
+        self.representatives = [sql_file for sql_file in sql_files if sql_file.name not in self.duplicates]
+
+    def class_sizes(self):
+        """{representative: number of files in its class}, for classes with duplicates."""
+        sizes = {}
+        for rep in self.duplicates.values():
+            sizes[rep] = sizes.get(rep, 1) + 1
+        return sizes
+
+    def instantiate(self, name: str, converted_folder: Path):
+        """Writes the converted output of duplicate `name` from its representative's; False if not possible."""
+        rep = self.duplicates[name]
+        rep_output_file = converted_folder / rep
+        if not rep_output_file.exists():
+            return False
+        rep_output = rep_output_file.read_text(encoding="utf-8", errors="replace")
+        if self.kind[name] == "exact":
+            output = rep_output
+        else:
+            output = reinstantiate(self.files[rep].read_text(encoding="utf-8", errors="replace"), rep_output,
+                                   self.files[name].read_text(encoding="utf-8", errors="replace"))
+            if output is None:
+                return False
+        with open(converted_folder / name, "w", encoding="utf-8", newline="") as f:
+            f.write(output)
+        return True
+
+    def summary_lines(self, instantiated):
+        """Class sizes and transpile calls saved, for the console and the log."""
+        sizes = self.class_sizes()
+        exact = sum(1 for kind in self.kind.values() if kind == "exact")
+        lines = [f"Dedup: {len(self.files)} files in {len(self.representatives)} classes, "
+                 f"{exact} exact and {len(self.duplicates) - exact} template duplicates, "
+                 f"{len(instantiated)} transpile calls saved"]
+        for rep, size in sorted(sizes.items(), key=lambda item: (-item[1], item[0])):
+            members = sorted(name for name, of in self.duplicates.items() if of == rep)
+            lines.append(f"  {rep}: {size} files ({', '.join(members)})")
+        return lines
@@ -0,0 +1,131 @@
+import hashlib
+import importlib.util
+import os
+import sys
+import threading
+from pathlib import Path
+
+from run_report import get_report
+from step3_folder_setup import DIALECTS
+
+# kind -> (sub folder, file, per-text function, batch function)
+PROCESSORS = {
+    "preprocessor": ("preprocessor", "preprocess.py", "preprocess", "preprocess_many"),
+    "postprocessor": ("postprocessor", "postprocess.py", "postprocess", "postprocess_many"),
+}
+
+_active_registry = None
+
+
+def dialect_folder(dialect: str):
+    # Same folder naming as the input/output folders: "SQL Server" -> sql_server
+    return dialect.strip().lower().replace(" ", "_")
+
+
+class DialectRegistry:
+    """
+    Finds the pre/post processors under dialects/<dialect>/ and imports each one
+    only when it is first used. Loaded modules live in sys.modules under a name of
+    their own (lakebridge_dialect_<dialect>_<kind>) and are re-imported when the
+    file's mtime changes.
+    """
+
+    def __init__(self, dialects_root: Path):
+        self.dialects_root = Path(dialects_root)
+        self._lock = threading.Lock()
+
+    def path(self, dialect: str, kind: str):
+        folder, file_name, _, _ = PROCESSORS[kind]
+        return self.dialects_root / dialect_folder(dialect) / folder / file_name
+
+    def discover(self):
+        """{dialect: {kind: processor path or None}} for the step 3 dialects and any other dialect folder."""
+        dialects = list(DIALECTS)
+        if self.dialects_root.is_dir():
+            dialects += sorted(entry.name for entry in os.scandir(self.dialects_root)
+                               if entry.is_dir() and entry.name not in DIALECTS and not entry.name.startswith("_"))
+        found = {}
+        for dialect in dialects:
+            found[dialect] = {kind: self.path(dialect, kind) if self.path(dialect, kind).is_file() else None
+                              for kind in PROCESSORS}
+        return found
+
+    def module_name(self, dialect: str, kind: str):
+        return f"lakebridge_dialect_{dialect_folder(dialect)}_{kind}"
+
+    def load(self, dialect: str, kind: str):
+        """The processor module, or None if the dialect has none of this kind."""
+        path = self.path(dialect, kind)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            return None
+        name = self.module_name(dialect, kind)
+        with self._lock:
+            module = sys.modules.get(name)
+            if module is not None and getattr(module, "__mtime_ns__", None) == mtime_ns:
+                return module
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            module.__mtime_ns__ = mtime_ns
+            sys.modules[name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                sys.modules.pop(name, None)
+                raise
+            return module
+
+    def _run_many(self, dialect: str, kind: str, texts, stage=None):
+        # stage: when set, each file the per-text fallback handles is recorded as a span of that stage
+        module = self.load(dialect, kind)
+        if module is None:
+            return dict(texts)
+        _, _, single, many = PROCESSORS[kind]
+        # Dialects may implement the batch call to share work across files
+        if hasattr(module, many):
+            return getattr(module, many)(dict(texts))
+        if stage is None:
+            return {name: getattr(module, single)(text) for name, text in texts.items()}
+        processed = {}
+        for name, text in texts.items():
+            with get_report().span(stage, name, len(text.encode("utf-8"))):
+                processed[name] = getattr(module, single)(text)
+        return processed
+
+    def preprocess_many(self, dialect: str, texts):
+        """
+        {file name: SQL} -> {file name: preprocessed SQL}; unchanged if the dialect has no preprocessor.
+        Each file is recorded as a "preprocess" span; a dialect's preprocess_many records its own.
+        """
+        return self._run_many(dialect, "preprocessor", texts, stage="preprocess")
+
+    def postprocess_many(self, dialect: str, texts):
+        """{file name: transpiled SQL} -> {file name: postprocessed SQL}."""
+        return self._run_many(dialect, "postprocessor", texts)
+
+    def source_hash(self, dialect: str):
+        """Hash of the dialect's processor folders (code and data files such as rules), for build cache keys."""
+        h = hashlib.sha256()
+        for kind in PROCESSORS:
+            folder = self.path(dialect, kind).parent
+            files = sorted(p for p in folder.rglob("*") if p.is_file() and "__pycache__" not in p.parts) \
+                if folder.is_dir() else []
+            for path in files:
+                h.update(f"{kind}/{path.relative_to(folder).as_posix()}".encode("utf-8") + b"\0")
+                h.update(path.read_bytes())
+        return h.hexdigest()
+
+
+def get_registry(dialects_root: Path = None):
+    """Returns the registry for dialects_root (default: <repo>/dialects), creating it on first use."""
+    global _active_registry
+    dialects_root = Path(dialects_root) if dialects_root else Path(__file__).resolve().parents[2] / "dialects"
+    if _active_registry is None or _active_registry.dialects_root != dialects_root:
+        _active_registry = DialectRegistry(dialects_root)
+    return _active_registry
+
+
+if __name__ == "__main__":
+    for dialect, processors in get_registry().discover().items():
+        print(f"{dialect}: " + ", ".join(f"{kind} {path or '-'}" for kind, path in processors.items()))
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+# Kept next to the report the preflight script writes
+FINGERPRINT_FILE = ROOT_DIR / "scripts" / "preflight" / "env_fingerprint.json"
+DEFAULT_TTL_HOURS = 24
+
+
+def _cli_version(cli_path):
+    if not cli_path:
+        return ""
+    try:
+        result = subprocess.run([cli_path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def _lakebridge_version(cli_path):
+    # The labs installer records the plugin version in its state folder; reading it avoids
+    # starting `databricks labs installed`, which is only the fallback
+    version_file = Path.home() / ".databricks" / "labs" / "lakebridge" / "state" / "version.json"
+    try:
+        with open(version_file, "r", encoding="utf-8") as f:
+            return str(json.load(f).get("version", ""))
+    except (OSError, ValueError):
+        pass
+    if not cli_path:
+        return ""
+    try:
+        result = subprocess.run([cli_path, "labs", "installed"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    lines = [line for line in result.stdout.splitlines() if "lakebridge" in line.lower()]
+    return " ".join(" ".join(lines).split())
+
+
+def read_config(config_file: Path):
+    try:
+        import yaml
+        with open(config_file, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except (ImportError, OSError, ValueError):
+        return {}
+
+
+def collect(profile=None):
+    """The environment the preflight and install steps set up; the version checks run concurrently."""
+    cli_path = shutil.which("databricks")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cli_version = pool.submit(_cli_version, cli_path)
+        lakebridge_version = pool.submit(_lakebridge_version, cli_path)
+        return {
+            "python": sys.version.split()[0],
+            "python_executable": sys.executable,
+            "java_path": shutil.which("java") or "",
+            "cli_path": cli_path or "",
+            "cli_version": cli_version.result(),
+            "lakebridge_version": lakebridge_version.result(),
+            "profile": profile or "",
+        }
+
+
+def digest(components):
+    return hashlib.sha256(json.dumps(components, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def is_complete(components):
+    return all(components.get(key) for key in ("cli_path", "cli_version", "lakebridge_version"))
+
+
+def matches(components, ttl_hours: float = DEFAULT_TTL_HOURS, fingerprint_file: Path = FINGERPRINT_FILE):
+    """
+    The stored record when the environment is unchanged since the last full preflight
+    and that run is less than ttl_hours old; otherwise None.
+    """
+    try:
+        with open(fingerprint_file, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not is_complete(components) or stored.get("fingerprint") != digest(components):
+        return None
+    if time.time() - float(stored.get("verified_at", 0)) > ttl_hours * 3600:
+        return None
+    return stored
+
+
+def save(components, fingerprint_file: Path = FINGERPRINT_FILE):
+    """Records a passed full preflight; incomplete environments are never recorded."""
+    if not is_complete(components):
+        return None
+    record = {"fingerprint": digest(components), "verified_at": time.time(),
+              "verified": time.strftime("%Y-%m-%d %H:%M:%S"), "components": components}
+    fingerprint_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = fingerprint_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    tmp_file.replace(fingerprint_file)
+    return record
+
+
+def clear(fingerprint_file: Path = FINGERPRINT_FILE):
+    """Forgets the last full preflight (--full-preflight), so the next run cannot skip it."""
+    try:
+        fingerprint_file.unlink()
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    config = read_config(ROOT_DIR / "config" / "config.yaml")
+    components = collect(config.get("profile"))
+    print(json.dumps(components, indent=2))
+    stored = matches(components, float(config.get("preflight_ttl_hours", DEFAULT_TTL_HOURS)))
+    print(f"Matches the full preflight of {stored['verified']}" if stored else "No matching fingerprint")
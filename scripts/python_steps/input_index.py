@@ -0,0 +1,239 @@
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from run_report import get_report
+
+DEFAULT_EXTENSIONS = (".sql", ".prc", ".tsql")
+INDEX_VERSION = 1
+
+_active_indexes = {}
+_active_lock = threading.Lock()
+
+
+def staged_name(rel_path: str):
+    """
+    The flat .sql file name an input travels under through steps 5 to 8:
+    sub/dir/proc.prc -> sub__dir__proc.prc.sql; top-level .sql files keep their name.
+    """
+    name = rel_path.replace("/", "__")
+    return name if name.lower().endswith(".sql") else name + ".sql"
+
+
+def name_for(path: Path, root: Path):
+    """staged_name of a file given by path, relative to root when it is under it."""
+    try:
+        return staged_name(Path(path).relative_to(root).as_posix())
+    except ValueError:
+        return staged_name(Path(path).name)
+
+
+@dataclass
+class InputFile:
+    root: Path
+    rel_path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    @property
+    def path(self):
+        # Built on demand: making 100k Path objects up front dominates a scan of an unchanged tree
+        return self.root / self.rel_path
+
+    @property
+    def name(self):
+        return staged_name(self.rel_path)
+
+
+def _sha256(path: Path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class InputIndex:
+    """
+    Input files under root, found by a recursive os.scandir walk and filtered by
+    extension and by include/exclude patterns (fnmatch on the path relative to root,
+    e.g. "archive/*"). Size, mtime and SHA-256 of every file are kept in index_file,
+    so a repeat scan stats each file but only reads the ones that changed.
+
+    scan() walks once and returns the same result until refresh=True, so every step
+    of a run shares one scan.
+    """
+
+    def __init__(self, root: Path, index_file: Path = None, extensions=DEFAULT_EXTENSIONS, include=(), exclude=(),
+                 recursive: bool = True):
+        self.root = Path(root)
+        self.index_file = Path(index_file) if index_file else None
+        self.extensions = tuple(ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions)
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ())
+        self.recursive = recursive
+        self.skipped = 0
+        self.folders = []
+        self._files = None
+        self._lock = threading.Lock()
+
+    def _excluded(self, rel_path: str):
+        return any(fnmatch.fnmatch(rel_path, pattern) for pattern in self.exclude)
+
+    def _included(self, rel_path: str):
+        return not self.include or any(fnmatch.fnmatch(rel_path, pattern) for pattern in self.include)
+
+    def walk(self):
+        """
+        Yields (relative path, DirEntry) for every matching file, without reading any.
+        Hidden entries are skipped, and so are folders matching an exclude pattern.
+        Counts the entries left out in self.skipped and lists the sub folders walked in self.folders.
+        """
+        self.skipped = 0
+        self.folders = []
+        pending = [("", self.root)]
+        while pending:
+            prefix, folder = pending.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                rel_path = prefix + entry.name
+                if entry.name.startswith((".", "~$")):
+                    self.skipped += 1
+                    continue
+                if entry.is_dir():
+                    if self.recursive and not self._excluded(rel_path):
+                        self.folders.append(Path(entry.path))
+                        pending.append((rel_path + "/", entry.path))
+                    else:
+                        self.skipped += 1
+                elif (entry.is_file() and entry.name.lower().endswith(self.extensions)
+                      and self._included(rel_path) and not self._excluded(rel_path)):
+                    yield rel_path, entry
+                else:
+                    self.skipped += 1
+
+    def _load(self):
+        if self.index_file is None:
+            return {}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != INDEX_VERSION or data.get("root") != str(self.root.resolve()):
+            return {}
+        return data.get("files", {})
+
+    def _save(self, files):
+        if self.index_file is None:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "root": str(self.root.resolve()), "files": files}, f)
+        tmp_file.replace(self.index_file)
+
+    def scan(self, refresh: bool = False):
+        """[InputFile] sorted by relative path; hashes only files that are new or changed since the last scan."""
+        with self._lock:
+            if self._files is not None and not refresh:
+                return self._files
+            started = time.perf_counter()
+            known = self._load()
+            files = {}
+            result = []
+            hashed = 0
+            for rel_path, entry in self.walk():
+                stat = entry.stat()
+                record = known.get(rel_path)
+                if record is None or record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+                    record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _sha256(Path(entry.path))}
+                    hashed += 1
+                files[rel_path] = record
+                result.append(InputFile(self.root, rel_path, record["size"], record["mtime_ns"], record["sha256"]))
+            result.sort(key=lambda input_file: input_file.rel_path)
+            removed = len(set(known) - set(files))
+            if hashed or removed or not self.index_file or not self.index_file.exists():
+                self._save(files)
+            self._check_names(result)
+            get_report().add("discover", str(self.root), "ok", sum(f.size for f in result),
+                             time.perf_counter() - started, hits=hashed)
+            print(f"Input index: {len(result)} file(s) under {self.root}, {hashed} new or changed, "
+                  f"{removed} removed, {self.skipped} skipped")
+            self._files = result
+            return result
+
+    @staticmethod
+    def _check_names(files):
+        seen = {}
+        for input_file in files:
+            other = seen.setdefault(input_file.name.lower(), input_file.rel_path)
+            if other != input_file.rel_path:
+                raise ValueError(f"Input files {other} and {input_file.rel_path} both map to {input_file.name}")
+
+    def is_flat(self):
+        """True when the scanned files are exactly the top-level .sql files of root, so root can be used as is."""
+        files = self.scan()
+        return (self.skipped == 0 and not self.folders
+                and all(input_file.name == input_file.rel_path for input_file in files))
+
+    def materialize(self, files, folder: Path):
+        """Hard-links (or copies) files into folder under their staged names; returns the folder."""
+        folder.mkdir(parents=True, exist_ok=True)
+        for input_file in files:
+            dest = folder / input_file.name
+            if dest.exists():
+                dest.unlink()
+            try:
+                os.link(input_file.path, dest)
+            except OSError:
+                shutil.copy2(input_file.path, dest)
+        return folder
+
+
+def options_from_config(config):
+    """InputIndex options from the input_* config keys."""
+    return {
+        "extensions": tuple(config.get("input_extensions") or DEFAULT_EXTENSIONS),
+        "include": tuple(config.get("input_include") or ()),
+        "exclude": tuple(config.get("input_exclude") or ()),
+        "recursive": bool(config.get("input_recursive", True)),
+    }
+
+
+def get_index(root: Path, index_file: Path = None, **options):
+    """Returns the index of root for this process, creating it on first use; steps share it and its scan."""
+    key = (str(Path(root).resolve()), tuple(sorted(options.items())))
+    with _active_lock:
+        index = _active_indexes.get(key)
+        if index is None or index.index_file != (Path(index_file) if index_file else None):
+            index = _active_indexes[key] = InputIndex(root, index_file, **options)
+        return index
+
+
+def scan_inputs(root: Path, config, index_file: Path = None, refresh: bool = False):
+    return get_index(root, index_file, **options_from_config(config)).scan(refresh)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="List the input files the steps will see")
+    parser.add_argument("root", help="Input folder, e.g. input/synapse")
+    parser.add_argument("--index-file", help="Persisted index to use and update")
+    parser.add_argument("--extensions", nargs="*", default=list(DEFAULT_EXTENSIONS))
+    parser.add_argument("--include", nargs="*", default=[])
+    parser.add_argument("--exclude", nargs="*", default=[])
+    args = parser.parse_args()
+    index = InputIndex(args.root, args.index_file, args.extensions, args.include, args.exclude)
+    for input_file in index.scan():
+        print(f"{input_file.rel_path}\t{input_file.size}\t{input_file.name}")
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Long-lived transpile worker: loads a lakebridge backend once and serves requests
+as JSON lines on stdin/stdout, so each file no longer pays the CLI, labs plugin
+and Python import startup.
+
+  worker -> {"ready": true, "backend": ..., "pid": ..., "startup_s": ...}
+  client -> {"id": 1, "argv": ["labs", "lakebridge", "transpile", "--input-source", ...]}
+  worker -> {"id": 1, "rc": 0, "stdout": ..., "stderr": ..., "wall_s": ..., "cpu_s": ..., "peak_rss_kb": ...}
+
+The "lakebridge" backend routes the request through the labs App of
+databricks.labs.lakebridge.cli in-process, so the worker must run with the
+python of the lakebridge venv (worker_python in config.yaml). Any other
+backend is "<module or file.py>:<function>" taking the argv after `databricks`
+and returning an exit code, e.g. tests/mock_cli/databricks:main.
+"""
+import contextlib
+import importlib
+import importlib.machinery
+import importlib.util
+import io
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from run_report import get_report, self_peak_rss_kb
+
+OUTPUT_TAIL_CHARS = 4000
+
+
+class WorkerUnavailable(Exception):
+    pass
+
+
+class WorkerTimeout(WorkerUnavailable):
+    """A request got no answer within its timeout; the worker is stopped."""
+
+
+def _flags(argv):
+    """--name value pairs of an argv list as a dict (bare flags map to "true")."""
+    flags = {}
+    i = 0
+    while i < len(argv):
+        if argv[i].startswith("--"):
+            has_value = i + 1 < len(argv) and not argv[i + 1].startswith("-")
+            flags[argv[i][2:]] = argv[i + 1] if has_value else "true"
+            i += 2 if has_value else 1
+        else:
+            i += 1
+    return flags
+
+
+def _lakebridge_backend():
+    from databricks.labs.lakebridge.cli import lakebridge as app
+
+    class _Errors(logging.Handler):
+        def __init__(self):
+            super().__init__(logging.ERROR)
+            self.count = 0
+
+        def emit(self, record):
+            self.count += 1
+
+    def run(argv):
+        # argv: labs lakebridge <command> [--flag value ...] [-p profile] [--debug]
+        if "-p" in argv:
+            os.environ["DATABRICKS_CONFIG_PROFILE"] = argv[argv.index("-p") + 1]
+        flags = _flags(argv[3:])
+        debug = flags.pop("debug", None) is not None
+        flags["log_level"] = "debug" if debug else "info"
+        errors = _Errors()
+        logging.getLogger().addHandler(errors)
+        try:
+            # The labs App logs command failures instead of raising them
+            app._route(json.dumps({"command": argv[2], "flags": flags}))
+        finally:
+            logging.getLogger().removeHandler(errors)
+        return 1 if errors.count else 0
+
+    return run
+
+
+def load_backend(spec: str):
+    if spec == "lakebridge":
+        return _lakebridge_backend()
+    target, _, func = spec.rpartition(":")
+    if os.path.sep in target or "/" in target or target.endswith(".py"):
+        loader = importlib.machinery.SourceFileLoader("lakebridge_worker_backend", target)
+        module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+        loader.exec_module(module)
+    else:
+        module = importlib.import_module(target)
+    return getattr(module, func)
+
+
+def serve(backend_spec: str):
+    # Keep the protocol on the original stdout; anything else writing to fd 1
+    # (the backend's child processes) goes to stderr instead
+    channel = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    started = time.perf_counter()
+    try:
+        backend = load_backend(backend_spec)
+    except Exception as e:
+        channel.write(json.dumps({"ready": False, "error": f"{e.__class__.__name__}: {e}"}) + "\n")
+        return 1
+    channel.write(json.dumps({"ready": True, "backend": backend_spec, "pid": os.getpid(),
+                              "startup_s": round(time.perf_counter() - started, 4)}) + "\n")
+    for line in sys.stdin:
+        request = json.loads(line)
+        out, err = io.StringIO(), io.StringIO()
+        wall, cpu = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                rc = backend(request["argv"]) or 0
+            except SystemExit as e:
+                rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception as e:
+                print(f"{e.__class__.__name__}: {e}", file=sys.stderr)
+                rc = 1
+        channel.write(json.dumps({
+            "id": request.get("id"), "rc": rc,
+            "stdout": out.getvalue()[-OUTPUT_TAIL_CHARS:], "stderr": err.getvalue()[-OUTPUT_TAIL_CHARS:],
+            "wall_s": time.perf_counter() - wall, "cpu_s": time.process_time() - cpu,
+            "peak_rss_kb": self_peak_rss_kb(),
+        }) + "\n")
+    return 0
+
+
+class LakebridgeWorker:
+    """Client side of one worker process."""
+
+    def __init__(self, backend: str = "lakebridge", python=None, log_file=None, startup_timeout: float = 120):
+        self.backend = backend
+        self.python = python or sys.executable
+        self.log_file = log_file
+        self.startup_timeout = startup_timeout
+        self.proc = None
+        self.info = {}
+        self._lines = queue.Queue()
+        self._ids = 0
+
+    @staticmethod
+    def _read(stdout, lines: queue.Queue):
+        for line in stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def _next_message(self, timeout):
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerTimeout(f"no answer within {timeout}s")
+        if line is None:
+            raise WorkerUnavailable(f"worker exited with code {self.proc.wait()}")
+        return json.loads(line)
+
+    def start(self):
+        wall = time.perf_counter()
+        stderr = open(self.log_file, "a", encoding="utf-8") if self.log_file else subprocess.DEVNULL
+        try:
+            self.proc = subprocess.Popen(
+                [self.python, str(Path(__file__).resolve()), "--backend", self.backend],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+                text=True, encoding="utf-8", bufsize=1,
+            )
+        except OSError as e:
+            raise WorkerUnavailable(str(e))
+        finally:
+            if stderr is not subprocess.DEVNULL:
+                stderr.close()
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, args=(self.proc.stdout, self._lines), daemon=True).start()
+        try:
+            self.info = self._next_message(self.startup_timeout)
+        except WorkerUnavailable as e:
+            self.stop()
+            # A worker too slow to start could not start; only request timeouts are WorkerTimeout
+            raise WorkerUnavailable(str(e)) from e
+        if not self.info.get("ready"):
+            self.stop()
+            raise WorkerUnavailable(self.info.get("error", "worker did not start"))
+        get_report().add("worker", f"start {self.backend}", "ok", wall_s=time.perf_counter() - wall)
+        return self
+
+    def request(self, argv, timeout=None):
+        """Runs one CLI-style command in the worker; returns the worker's response dict."""
+        if self.proc is None or self.proc.poll() is not None:
+            raise WorkerUnavailable("worker is not running")
+        self._ids += 1
+        try:
+            self.proc.stdin.write(json.dumps({"id": self._ids, "argv": list(argv)}) + "\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise WorkerUnavailable(str(e))
+        try:
+            return self._next_message(timeout)
+        except WorkerTimeout:
+            # Still busy with the request; a graceful stop would wait for it to finish
+            self.proc.kill()
+            self.stop()
+            raise
+        except WorkerUnavailable:
+            self.stop()
+            raise
+
+    def stop(self):
+        if self.proc is None:
+            return
+        wall = time.perf_counter()
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        get_report().add("worker", f"stop {self.backend}", "ok", wall_s=time.perf_counter() - wall)
+        self.proc = None
+
+
+class WorkerPool:
+    """A fixed number of workers shared by the transpile threads; each request takes an idle one."""
+
+    def __init__(self, size: int, **worker_options):
+        self.size = max(1, size)
+        self.worker_options = worker_options
+        self.workers = []
+        self._idle = queue.Queue()
+
+    def start(self):
+        self.workers = [LakebridgeWorker(**self.worker_options) for _ in range(self.size)]
+        # Workers load their backend in parallel; any failure aborts the whole pool
+        with ThreadPoolExecutor(max_workers=self.size) as pool:
+            for worker in pool.map(LakebridgeWorker.start, self.workers):
+                self._idle.put(worker)
+        return self
+
+    def run(self, argv, timeout=None):
+        worker = self._idle.get()
+        try:
+            # A worker that died on an earlier request is restarted when it is next used
+            if worker.proc is None:
+                worker.start()
+            return worker.request(argv, timeout)
+        finally:
+            self._idle.put(worker)
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+
+_active_pool = None
+
+
+def get_worker_pool():
+    """The pool started for this run, or None when transpiles go through the CLI."""
+    return _active_pool
+
+
+def start_worker_pool(size: int, **worker_options):
+    """Starts the workers; returns the pool, or None (CLI fallback) if they cannot start."""
+    global _active_pool
+    pool = WorkerPool(size, **worker_options)
+    try:
+        _active_pool = pool.start()
+    except WorkerUnavailable as e:
+        pool.stop()
+        print(f"Transpile worker unavailable ({e}); using the CLI per call", file=sys.stderr)
+        _active_pool = None
+    return _active_pool
+
+
+def stop_worker_pool():
+    global _active_pool
+    if _active_pool is not None:
+        _active_pool.stop()
+    _active_pool = None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve lakebridge commands from one warm process")
+    parser.add_argument("--backend", default="lakebridge", help='"lakebridge" or <module or file.py>:<function>')
+    args = parser.parse_args()
+    sys.exit(serve(args.backend))
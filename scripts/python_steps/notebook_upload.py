@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from run_report import get_report
+
+
+class NotebookUploader:
+    """Uploads notebooks with `databricks workspace import` from an asyncio event loop.
+
+    At most max_concurrency imports run at once; a failed import is retried with
+    exponential backoff. `cli` may point at a stub executable for local testing.
+
+    With a manifest_file, the content hash of every uploaded notebook is recorded per
+    remote path and unchanged notebooks are not uploaded again unless force is set.
+
+    on_result(notebook name, "Uploaded"/"Unchanged"/"Failed") is called as each upload settles.
+    """
+
+    def __init__(self, log_file=None, remote_dir: str = "/Shared", max_concurrency: int = 4,
+                 retries: int = 3, backoff_seconds: float = 2.0, timeout: int = 600, cli: str = "databricks",
+                 manifest_file=None, force: bool = False, on_result=None):
+        self.log_file = log_file
+        self.remote_dir = remote_dir.rstrip("/")
+        self.max_concurrency = max(1, max_concurrency)
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.cli = shutil.which(cli) or cli
+        self.manifest_file = Path(manifest_file) if manifest_file else None
+        self.force = force
+        self.on_result = on_result
+        self.manifest = self._load_manifest()
+        self.uploaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes_uploaded = 0
+        self.bytes_avoided = 0
+        # The pipeline scheduler uploads from several stage threads, each with its own loop
+        self._lock = threading.Lock()
+
+    def _load_manifest(self):
+        if self.manifest_file is None or not self.manifest_file.exists():
+            return {}
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        if self.manifest_file is None:
+            return
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix(".tmp")
+        with self._lock:
+            manifest = dict(self.manifest)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.manifest_file)
+
+    def stats_line(self):
+        return (
+            f"Notebook upload: {self.uploaded} uploaded ({self.bytes_uploaded} bytes), "
+            f"{self.skipped} unchanged skipped ({self.bytes_avoided} bytes avoided), {self.failed} failed"
+        )
+
+    def _log(self, msg: str):
+        if self.log_file:
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(msg + "\n")
+
+    async def _import_once(self, notebook_file: Path):
+        proc = await asyncio.create_subprocess_exec(
+            self.cli, "workspace", "import",
+            "--file", str(notebook_file),
+            f"{self.remote_dir}/{notebook_file.name}",
+            "--language", "PYTHON", "--overwrite",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return False, "timed out"
+        return proc.returncode == 0, stderr.decode("utf-8", errors="replace").strip()
+
+    async def upload(self, notebook_file: Path):
+        """Returns True once the notebook is imported (or unchanged), False after the last retry fails."""
+        remote_path = f"{self.remote_dir}/{notebook_file.name}"
+        content = notebook_file.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            unchanged = not self.force and self.manifest.get(remote_path, {}).get("sha256") == digest
+            if unchanged:
+                self.skipped += 1
+                self.bytes_avoided += len(content)
+        if unchanged:
+            get_report().add("upload", notebook_file.name, "unchanged", len(content), 0.0)
+            self._notify(notebook_file, "Unchanged")
+            return True
+        started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        wall = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                ok, detail = await self._import_once(notebook_file)
+            except OSError as e:
+                # e.g. no databricks binary; retrying cannot help
+                self._log(f"Upload Notebook {notebook_file.name} failed: could not run {self.cli}: {e}")
+                break
+            if ok:
+                print(f"Uploaded notebook {notebook_file.name}")
+                with self._lock:
+                    self.manifest[remote_path] = {"sha256": digest, "size": len(content)}
+                    self.uploaded += 1
+                    self.bytes_uploaded += len(content)
+                get_report().add("upload", notebook_file.name, "ok" if attempt == 0 else f"ok after {attempt} retries",
+                                 len(content), time.perf_counter() - wall, started=started)
+                self._notify(notebook_file, "Uploaded")
+                return True
+            self._log(f"Upload Notebook {notebook_file.name} failed (attempt {attempt + 1}): {detail}")
+            if attempt < self.retries:
+                delay = self.backoff_seconds * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        with self._lock:
+            self.failed += 1
+        get_report().add("upload", notebook_file.name, "failed", len(content), time.perf_counter() - wall,
+                         started=started)
+        self._notify(notebook_file, "Failed")
+        return False
+
+    def _notify(self, notebook_file: Path, status: str):
+        if self.on_result:
+            self.on_result(notebook_file.name, status)
+
+    async def _consume(self, queue: asyncio.Queue, results: dict):
+        while True:
+            notebook_file = await queue.get()
+            if notebook_file is None:
+                return
+            results[notebook_file.name] = await self.upload(notebook_file)
+
+    async def run(self, items, prepare):
+        """Runs prepare(item) -> notebook path, list of paths or None in a worker thread for each item and
+        feeds the notebooks through a bounded queue to the upload workers, so preparing
+        the next notebook overlaps with uploading the previous ones.
+
+        Returns {notebook name: uploaded?}.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+        results = {}
+        workers = [asyncio.create_task(self._consume(queue, results)) for _ in range(self.max_concurrency)]
+        try:
+            for item in items:
+                prepared = await loop.run_in_executor(None, prepare, item)
+                for notebook_file in (prepared if isinstance(prepared, list) else [prepared]):
+                    if notebook_file is not None:
+                        await queue.put(Path(notebook_file))
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            self.save_manifest()
+        self._log(self.stats_line())
+        print(self.stats_line())
+        return results
+
+
+def run_upload_stage(items, prepare, **uploader_options):
+    """Synchronous entry point for NotebookUploader.run."""
+    uploader = NotebookUploader(**uploader_options)
+    return asyncio.run(uploader.run(items, prepare))
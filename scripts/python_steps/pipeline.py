@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline. func(batch) takes a list of up to batch_size items and
+    returns the items to hand to the next stage (dropping an item stops it there).
+    `workers` threads run the stage; CPU-bound work should be sent to a process pool
+    from inside func.
+    """
+
+    def __init__(self, name: str, func, workers: int = 1, batch_size: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues, so each item moves on as
+    soon as its own stage finishes instead of waiting for the whole corpus. A full
+    queue blocks the stage feeding it, which keeps memory and staged files bounded.
+    """
+
+    def __init__(self, stages, queue_size: int = 64):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(stages) + 1)]
+        self.first_output_s = None
+        self.stage_busy_s = {stage.name: 0.0 for stage in stages}
+        self._lock = threading.Lock()
+        self._remaining = [stage.workers for stage in stages]
+        self._started = None
+
+    def _next_batch(self, stage: Stage, in_queue: queue.Queue):
+        # Blocks for one item, then takes whatever else is already waiting up to batch_size
+        item = in_queue.get()
+        if item is _DONE:
+            return [], True
+        batch = [item]
+        while len(batch) < stage.batch_size:
+            try:
+                item = in_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        in_queue, out_queue = self.queues[index], self.queues[index + 1]
+        done = False
+        while not done:
+            batch, done = self._next_batch(stage, in_queue)
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                outputs = stage.func(batch) or []
+            except Exception as e:
+                logging.error(f"Pipeline stage {stage.name} failed for {len(batch)} item(s): {e}")
+                outputs = []
+            with self._lock:
+                self.stage_busy_s[stage.name] += time.perf_counter() - started
+                if outputs and index == len(self.stages) - 1 and self.first_output_s is None:
+                    self.first_output_s = time.perf_counter() - self._started
+            for output in outputs:
+                out_queue.put(output)
+        with self._lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last:
+            # The last worker out tells every worker of the next stage (or the collector) to stop
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(next_workers):
+                out_queue.put(_DONE)
+
+    def run(self, items):
+        """Feeds items in order and returns what comes out of the last stage."""
+        self._started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(self.stages) for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        results = []
+        collector = threading.Thread(target=self._collect, args=(results,), daemon=True)
+        collector.start()
+        for item in items:
+            self.queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            self.queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        collector.join()
+        return results
+
+    def _collect(self, results: list):
+        while True:
+            item = self.queues[-1].get()
+            if item is _DONE:
+                return
+            results.append(item)
@@ -0,0 +1,193 @@
+import re
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+from run_report import get_report
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Backreferences inside a rule pattern would point at the wrong group once the rules are combined
+NUMBERED_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+NAMED_GROUP = re.compile(r"\(\?P<(\w+)>")
+
+MAX_GUARD_CHARS = 256
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _first_chars(items, ignore_case=False):
+    """
+    Characters a parsed pattern can start with, or None when that is not a small
+    known set (e.g. it starts with a class such as word characters, or can match nothing).
+    """
+    for op, arg in items:
+        if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue  # zero-width
+        if op is sre_constants.LITERAL:
+            chars = {chr(arg)}
+        elif op is sre_constants.IN:
+            chars = set()
+            for item_op, item_arg in arg:
+                if item_op is sre_constants.LITERAL:
+                    chars.add(chr(item_arg))
+                elif item_op is sre_constants.RANGE and item_arg[1] - item_arg[0] < MAX_GUARD_CHARS:
+                    chars.update(chr(c) for c in range(item_arg[0], item_arg[1] + 1))
+                else:
+                    return None
+        elif op is sre_constants.SUBPATTERN:
+            return _first_chars(arg[-1], ignore_case or bool(arg[1] & sre_constants.SRE_FLAG_IGNORECASE))
+        elif op is sre_constants.BRANCH:
+            chars = set()
+            for branch in arg[1]:
+                branch_chars = _first_chars(branch, ignore_case)
+                if branch_chars is None:
+                    return None
+                chars |= branch_chars
+            return chars
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and arg[0] >= 1:
+            return _first_chars(arg[2], ignore_case)
+        else:
+            return None
+        if ignore_case:
+            chars |= {c.lower() for c in chars} | {c.upper() for c in chars}
+        return chars
+    return None
+
+
+class Rule:
+    def __init__(self, name: str, pattern: str, replace: str = None, function=None, ignore_case: bool = True,
+                 description: str = ""):
+        if NUMBERED_BACKREF.search(pattern):
+            raise ValueError(f"Rule {name}: backreferences are not supported in patterns")
+        self.name = name
+        self.pattern = f"(?i:{pattern})" if ignore_case else f"(?:{pattern})"
+        self.regex = re.compile(self.pattern)
+        self.replace = replace
+        self.function = function
+        self.description = description
+
+    def apply(self, match):
+        if self.function is not None:
+            return self.function(match)
+        return match.expand(self.replace)
+
+
+class RuleSet:
+    """
+    Rewrite rules compiled once into a single alternation, so a text is rewritten in
+    one left-to-right pass however many rules there are. Where several rules match at
+    the same position the first declared wins; replaced text is not matched again.
+
+    Hits and the time spent building replacements are counted per rule until
+    flush_report() writes them to the run report.
+    """
+
+    def __init__(self, rules, source: str = ""):
+        self.rules = list(rules)
+        self.source = source
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate rule names in {source or 'rule set'}")
+        # Each rule sits in its own named group; named groups inside a rule are made unique per rule
+        alternatives = "|".join(
+            f"(?P<_r{n}>{NAMED_GROUP.sub(lambda m, n=n: f'(?P<_r{n}_{m.group(1)}>', rule.pattern)})"
+            for n, rule in enumerate(self.rules)
+        )
+        # When every rule starts with one of a few known characters, a lookahead on them lets
+        # the scan skip other positions without trying each alternative there
+        guard = set()
+        for rule in self.rules:
+            chars = _first_chars(sre_parse.parse(rule.pattern))
+            guard = guard | chars if chars is not None and guard is not None else None
+        if guard and len(guard) <= MAX_GUARD_CHARS:
+            alternatives = f"(?=[{''.join(re.escape(c) for c in sorted(guard))}])(?:{alternatives})"
+        self.combined = re.compile(alternatives) if self.rules else None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.hits = {rule.name: 0 for rule in self.rules}
+        self.seconds = {rule.name: 0.0 for rule in self.rules}
+        self.passes = 0
+        self.pass_seconds = 0.0
+        self.bytes_in = 0
+
+    def _replace(self, match, hits, seconds):
+        rule_index = int(match.lastgroup[2:])
+        rule = self.rules[rule_index]
+        started = time.perf_counter()
+        # Re-matching the one rule at this position gives the rule's own group numbers for the template
+        replacement = rule.apply(rule.regex.match(match.string, match.start()))
+        seconds[rule_index] += time.perf_counter() - started
+        hits[rule_index] += 1
+        return replacement
+
+    def rewrite(self, text: str):
+        if self.combined is None:
+            return text
+        hits = [0] * len(self.rules)
+        seconds = [0.0] * len(self.rules)
+        started = time.perf_counter()
+        result = self.combined.sub(lambda match: self._replace(match, hits, seconds), text)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            for n, rule in enumerate(self.rules):
+                self.hits[rule.name] += hits[n]
+                self.seconds[rule.name] += seconds[n]
+            self.passes += 1
+            self.pass_seconds += elapsed
+            self.bytes_in += len(text)
+        return result
+
+    def rewrite_many(self, texts):
+        return {name: self.rewrite(text) for name, text in texts.items()}
+
+    def flush_report(self, stage: str = "rewrite"):
+        """Adds one span per rule (hits, replacement time) and one for the passes, then resets the counters."""
+        with self._lock:
+            if not self.passes:
+                return
+            report = get_report()
+            report.add(stage, Path(self.source).name or "rules", "ok", self.bytes_in, self.pass_seconds,
+                       hits=self.passes)
+            for rule in self.rules:
+                report.add(f"{stage}_rule", rule.name, "ok", wall_s=self.seconds[rule.name], hits=self.hits[rule.name])
+            self._reset()
+
+
+def load_rules(rules_file: Path, functions=None):
+    """
+    Reads a YAML rules file: a list of {name, pattern, replace | function, ignore_case, description}.
+    `function` names a callable in functions, called with the match and returning the replacement.
+    The compiled RuleSet is cached until the file (or the functions mapping) changes.
+    """
+    rules_file = Path(rules_file)
+    mtime_ns = rules_file.stat().st_mtime_ns
+    with _loaded_lock:
+        cached = _loaded.get(rules_file)
+        if cached is not None and cached[:2] == (mtime_ns, id(functions)):
+            return cached[2]
+        with open(rules_file, "r", encoding="utf-8") as f:
+            entries = yaml.safe_load(f) or []
+        rules = []
+        for entry in entries:
+            function = None
+            if entry.get("function"):
+                function = (functions or {}).get(entry["function"])
+                if function is None:
+                    raise ValueError(f"Rule {entry['name']}: unknown function {entry['function']}")
+            elif entry.get("replace") is None:
+                raise ValueError(f"Rule {entry['name']}: needs replace or function")
+            rules.append(Rule(entry["name"], entry["pattern"], entry.get("replace"), function,
+                              entry.get("ignore_case", True), entry.get("description", "")))
+        rule_set = RuleSet(rules, str(rules_file))
+        _loaded[rules_file] = (mtime_ns, id(functions), rule_set)
+        return rule_set
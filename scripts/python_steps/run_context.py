@@ -0,0 +1,76 @@
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class RunContext:
+    """
+    In-process handoff between step5 (pre-process) and step6 (core engine).
+
+    Small inputs travel as preprocessed text; inputs preprocessed in stream mode
+    travel as paths to their staged files. Both are keyed by the original input path,
+    and names maps that path to the flat .sql name the file is processed under.
+    staging_folder is step5's stream-mode folder, removed by cleanup() once step6 is done.
+    """
+    config_path: Path
+    config: Dict[str, Any]
+    dialect: str
+    output_folder: Path
+    processed_texts: Dict[str, str] = field(default_factory=dict)
+    staged_files: Dict[str, Path] = field(default_factory=dict)
+    names: Dict[str, str] = field(default_factory=dict)
+    staging_folder: Optional[Path] = None
+
+    @classmethod
+    def from_step5_result(cls, result: Dict[str, Any], config_path):
+        ctx = cls(
+            config_path=Path(config_path),
+            config=result.get("config") or {},
+            dialect=result["dialect"],
+            output_folder=Path(result["output_folder"]),
+            names=dict(result.get("names") or {}),
+            staging_folder=Path(result["staging_folder"]) if result.get("staging_folder") else None,
+        )
+        for src, value in result["processed_files"].items():
+            if result.get("staged"):
+                ctx.staged_files[src] = Path(value)
+            else:
+                ctx.processed_texts[src] = value
+        return ctx
+
+    def name(self, src: str):
+        return self.names.get(src) or Path(src).name
+
+    def file_names(self):
+        return sorted(self.name(src) for src in list(self.processed_texts) + list(self.staged_files))
+
+    def materialize(self, folder: Path):
+        """
+        Returns a folder holding every preprocessed file under its name.
+        Staged files already sharing one folder are used in place; otherwise they
+        are hard-linked (or copied) next to the in-memory texts written to `folder`.
+        """
+        staged_parents = {p.parent for p in self.staged_files.values()}
+        if not self.processed_texts and len(staged_parents) == 1:
+            return staged_parents.pop()
+        folder.mkdir(parents=True, exist_ok=True)
+        for src, text in self.processed_texts.items():
+            with open(folder / self.name(src), "w", encoding="utf-8") as f:
+                f.write(text)
+        for src, staged in self.staged_files.items():
+            dest = folder / self.name(src)
+            if dest.exists():
+                dest.unlink()
+            try:
+                os.link(staged, dest)
+            except OSError:
+                shutil.copy2(staged, dest)
+        return folder
+
+    def cleanup(self):
+        """Deletes the stream-mode staging folder; the staged files are gone afterwards."""
+        if self.staging_folder is not None:
+            shutil.rmtree(self.staging_folder, ignore_errors=True)
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Per-file stages in pipeline order; "build" records Cached/Rebuilt/Resumed
+STAGES = ("analyze", "transpile", "format", "notebook", "upload", "build")
+DONE_STATUSES = {"Success", "Succeeded", "Uploaded", "Unchanged"}
+
+
+class RunJournal:
+    """
+    Append-only JSONL write-ahead journal of per-file progress through the pipeline.
+
+    Every record is flushed and fsynced before record() returns, so a crashed or
+    killed run keeps everything it finished. Replaying the file rebuilds the latest
+    status of each (file, stage); a truncated last line is ignored.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.state = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._replay()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, metadata_folder: Path, ts: str):
+        return cls(Path(metadata_folder) / f"run_journal_{ts}.jsonl")
+
+    @classmethod
+    def latest(cls, metadata_root: Path):
+        """Opens the most recent journal under metadata/<date>/, or None if there is none."""
+        journals = sorted(Path(metadata_root).glob("*/run_journal_*.jsonl"), key=lambda p: p.name)
+        return cls(journals[-1]) if journals else None
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "file" in record:
+                    self.state.setdefault(record["file"], {})[record["stage"]] = record
+
+    def record(self, file_name: str, stage: str, status: str, sha: str = None, **extra):
+        record = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "file": file_name, "stage": stage,
+                  "status": status, "sha": sha, **extra}
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self.state.setdefault(file_name, {})[stage] = record
+
+    def event(self, name: str, **extra):
+        """Records a run-level event (start, resume, finish)."""
+        with self._lock:
+            self._fh.write(json.dumps({"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "event": name, **extra}) + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def status(self, file_name: str, stage: str, sha: str = None):
+        """Latest status of the stage, ignoring records made for a different input (sha)."""
+        record = self.state.get(file_name, {}).get(stage)
+        if not record or (sha is not None and record.get("sha") != sha):
+            return None
+        return record["status"]
+
+    def detail(self, file_name: str, stage: str, key: str, sha: str = None):
+        """An extra field of the latest stage record (e.g. "error"), or None."""
+        record = self.state.get(file_name, {}).get(stage)
+        if not record or (sha is not None and record.get("sha") != sha):
+            return None
+        return record.get(key)
+
+    def is_done(self, file_name: str, stage: str, sha: str = None):
+        """True if the stage finished for this exact input (sha) in a journaled run."""
+        record = self.state.get(file_name, {}).get(stage)
+        return bool(record) and record["status"] in DONE_STATUSES and (sha is None or record.get("sha") == sha)
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
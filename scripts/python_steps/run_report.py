@@ -0,0 +1,181 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+FIELDS = ["stage", "name", "status", "size_bytes", "wall_s", "cpu_s", "peak_rss_kb", "started", "hits"]
+
+_active_report = None
+
+
+def get_report():
+    """Returns the report of the current run, creating it on first use."""
+    global _active_report
+    if _active_report is None:
+        _active_report = RunReport()
+    return _active_report
+
+
+def start_report():
+    """Replaces the current run's report with an empty one and returns it."""
+    global _active_report
+    _active_report = RunReport()
+    return _active_report
+
+
+def self_peak_rss_kb():
+    """Peak resident set size of this process so far, in KB (None if unavailable)."""
+    try:
+        if sys.platform == "win32":
+            return _windows_usage(None)[1]
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == "darwin" else rss
+    except Exception:
+        return None
+
+
+def _windows_usage(handle):
+    """(cpu seconds, peak working set KB) of a process handle; None means this process."""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.windll.kernel32
+    if handle is None:
+        handle = kernel32.GetCurrentProcess()
+    creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+    kernel32.GetProcessTimes(wintypes.HANDLE(int(handle)), ctypes.byref(creation), ctypes.byref(exit_),
+                             ctypes.byref(kernel), ctypes.byref(user))
+    to_seconds = lambda ft: ((ft.dwHighDateTime << 32) + ft.dwLowDateTime) / 1e7
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(wintypes.HANDLE(int(handle)), ctypes.byref(counters), counters.cb)
+    return to_seconds(kernel) + to_seconds(user), counters.PeakWorkingSetSize // 1024
+
+
+def run_measured(args, timeout=None, **popen_kwargs):
+    """
+    Runs a command like subprocess.run and returns (returncode, usage) where usage has
+    wall_s, cpu_s and peak_rss_kb of the child (including the children it waited for,
+    e.g. the CLI behind shell=True on POSIX). Raises subprocess.TimeoutExpired after
+    killing the child.
+    """
+    started = time.perf_counter()
+    proc = subprocess.Popen(args, **popen_kwargs)
+    usage = {"wall_s": None, "cpu_s": None, "peak_rss_kb": None}
+    if sys.platform == "win32":
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        try:
+            usage["cpu_s"], usage["peak_rss_kb"] = _windows_usage(proc._handle)
+        except Exception:
+            pass
+    else:
+        reaped = {}
+
+        def _reap():
+            # wait4 reports the child's own rusage, which subprocess.wait() discards
+            _, reaped["status"], reaped["rusage"] = os.wait4(proc.pid, 0)
+
+        waiter = threading.Thread(target=_reap, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        if waiter.is_alive():
+            proc.kill()
+            waiter.join()
+            proc.returncode = os.waitstatus_to_exitcode(reaped["status"])
+            raise subprocess.TimeoutExpired(args, timeout)
+        proc.returncode = os.waitstatus_to_exitcode(reaped["status"])
+        rusage = reaped["rusage"]
+        usage["cpu_s"] = rusage.ru_utime + rusage.ru_stime
+        usage["peak_rss_kb"] = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    usage["wall_s"] = time.perf_counter() - started
+    return proc.returncode, usage
+
+
+class RunReport:
+    """Collects timing spans for one run and writes them as JSON and CSV."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, name: str = "", status: str = "ok", size_bytes=None,
+            wall_s=None, cpu_s=None, peak_rss_kb=None, started=None, hits=None):
+        span = {
+            "stage": stage,
+            "name": name,
+            "status": status,
+            "size_bytes": size_bytes,
+            "wall_s": round(wall_s, 4) if wall_s is not None else None,
+            "cpu_s": round(cpu_s, 4) if cpu_s is not None else None,
+            "peak_rss_kb": peak_rss_kb,
+            "started": started or time.strftime("%Y-%m-%dT%H:%M:%S"),
+            # How many things the span covered, e.g. matches of a rewrite rule
+            "hits": hits,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, stage: str, name: str = "", size_bytes=None):
+        """Times in-process work; CPU is this thread's CPU time, RSS this process's peak."""
+        started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        result = {"status": "ok"}
+        try:
+            yield result
+        except BaseException:
+            result["status"] = "failed"
+            raise
+        finally:
+            self.add(stage, name, result["status"], size_bytes, time.perf_counter() - wall,
+                     time.thread_time() - cpu, self_peak_rss_kb(), started)
+
+    def stage_totals(self):
+        totals = {}
+        for span in self.spans:
+            stage = totals.setdefault(span["stage"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                                      "size_bytes": 0, "max_wall_s": 0.0})
+            stage["count"] += 1
+            stage["wall_s"] += span["wall_s"] or 0
+            stage["cpu_s"] += span["cpu_s"] or 0
+            stage["size_bytes"] += span["size_bytes"] or 0
+            stage["max_wall_s"] = max(stage["max_wall_s"], span["wall_s"] or 0)
+        return totals
+
+    def write(self, folder: Path, ts: str):
+        """Writes run_report_<ts>.json and run_report_<ts>.csv; returns both paths."""
+        folder = Path(folder)
+        json_file = folder / f"run_report_{ts}.json"
+        csv_file = folder / f"run_report_{ts}.csv"
+        with self._lock:
+            spans = list(self.spans)
+        slowest = sorted((s for s in spans if s["wall_s"] is not None), key=lambda s: s["wall_s"], reverse=True)
+        with open(json_file, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stage_totals(), "slowest": slowest[:20], "spans": spans}, f, indent=2)
+        with open(csv_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(spans)
+        return json_file, csv_file
@@ -0,0 +1,191 @@
+import os
+import re
+import time
+from functools import partial
+from pathlib import Path
+
+from run_report import self_peak_rss_kb
+
+# A line holding only the T-SQL batch separator
+BATCH_SEPARATOR = re.compile(r"^\s*GO\s*;?\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def format_sql(sql_text: str):
+    import sqlparse
+    return sqlparse.format(sql_text, reindent=True, keyword_case="upper")
+
+
+def split_batches(sql_text: str):
+    """Splits a script at GO lines. Returns [(batch text, separator or None)]."""
+    batches = []
+    last = 0
+    for match in BATCH_SEPARATOR.finditer(sql_text):
+        batches.append((sql_text[last:match.start()], "GO"))
+        last = match.end()
+    batches.append((sql_text[last:], None))
+    return batches
+
+
+def format_batches(batches):
+    """Formats batches statement by statement; returns one formatted string per batch.
+
+    sqlparse gets slow on very large inputs, so each statement is formatted on its own.
+    """
+    # sqlparse is only imported once there is something to format
+    import sqlparse
+    out = []
+    for batch, separator in batches:
+        statements = [format_sql(statement) for statement in sqlparse.split(batch) if statement.strip()]
+        if separator:
+            statements.append(separator)
+        out.append("\n".join(statements))
+    return out
+
+
+def format_sql_split(sql_text: str):
+    return "\n".join(part for part in format_batches(split_batches(sql_text)) if part)
+
+
+def write_formatted(sql_file: Path, sql_content: str, final_folder: Path, notebooks_folder: Path):
+    final_file = final_folder / sql_file.name
+    with open(final_file, "w", encoding="utf-8") as f:
+        f.write(sql_content)
+    notebook_file = notebooks_folder / (sql_file.stem + ".py")
+    with open(notebook_file, "w", encoding="utf-8") as f:
+        f.write("# Databricks notebook source\n")
+        f.write(f'"""\nAuto-generated from {sql_file.name}\n"""\n\n')
+        f.write('sql_query = """\n')
+        f.write(sql_content)
+        f.write('\n"""\n')
+        f.write("display(spark.sql(sql_query))\n")
+    return notebook_file
+
+
+class _Timer:
+    """Measures one step inside a worker; span() returns a run_report span dict."""
+
+    def __init__(self):
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def span(self, stage: str, name: str, size_bytes=None):
+        return {
+            "stage": stage, "name": name, "size_bytes": size_bytes, "started": self.started,
+            "wall_s": time.perf_counter() - self.wall, "cpu_s": time.thread_time() - self.cpu,
+            "peak_rss_kb": self_peak_rss_kb(),
+        }
+
+
+def write_notebook(sql_file: Path, final_folder: Path, notebooks_folder: Path, split_threshold: int = 0):
+    """Formats one converted SQL file into Final_Formatted and writes its notebook.
+
+    Files of split_threshold bytes or more use format_sql_split (0 disables it).
+    Returns (notebook path, [format span, notebook span]).
+    """
+    timer = _Timer()
+    with open(sql_file, "r", encoding="utf-8", errors="replace") as f:
+        sql_content = f.read()
+    size = len(sql_content)
+    if split_threshold and size >= split_threshold:
+        sql_content = format_sql_split(sql_content)
+    else:
+        sql_content = format_sql(sql_content)
+    spans = [timer.span("format", sql_file.name, size)]
+    timer = _Timer()
+    notebook_file = write_formatted(sql_file, sql_content, final_folder, notebooks_folder)
+    spans.append(timer.span("notebook", notebook_file.name, notebook_file.stat().st_size))
+    return notebook_file, spans
+
+
+def format_chunk(sql_files, final_folder: Path, notebooks_folder: Path, split_threshold: int = 0):
+    """Worker entry point: returns [(file name, notebook path or None, status, timing spans)]."""
+    results = []
+    for sql_file in sql_files:
+        try:
+            notebook_file, spans = write_notebook(sql_file, final_folder, notebooks_folder, split_threshold)
+            results.append((sql_file.name, notebook_file, "Succeeded", spans))
+        except Exception as e:
+            results.append((sql_file.name, None, f"Failed: {e}", []))
+    return results
+
+
+def chunk_by_size(sql_files, chunks: int):
+    """Splits files into up to `chunks` groups of similar total size, largest files first."""
+    bins = [[0, []] for _ in range(max(1, min(chunks, len(sql_files))))]
+    for sql_file in sorted(sql_files, key=lambda p: p.stat().st_size, reverse=True):
+        smallest = min(bins, key=lambda b: b[0])
+        smallest[0] += sql_file.stat().st_size
+        smallest[1].append(sql_file)
+    return [files for _, files in bins if files]
+
+
+def group_contiguous(items, groups: int, size_of=len):
+    """Cuts items into up to `groups` runs of similar total size_of(item), keeping their order."""
+    target = sum(size_of(item) for item in items) / max(1, groups)
+    runs, current, size = [], [], 0
+    for item in items:
+        current.append(item)
+        size += size_of(item)
+        if size >= target and len(runs) < groups - 1:
+            runs.append(current)
+            current, size = [], 0
+    if current:
+        runs.append(current)
+    return runs
+
+
+def format_batches_timed(batches):
+    """Worker entry point for one run of batches: returns (formatted parts, format span)."""
+    timer = _Timer()
+    parts = format_batches(batches)
+    return parts, timer.span("format", "", sum(len(text) for text, _ in batches))
+
+
+def _finish_split(sql_file: Path, futures, final_folder: Path, notebooks_folder: Path):
+    try:
+        results = [future.result() for future in futures]
+        parts = [part for run_parts, _ in results for part in run_parts]
+        run_spans = [span for _, span in results]
+        # Runs were formatted in parallel: wall is the slowest run, CPU the sum of all
+        spans = [{
+            "stage": "format", "name": sql_file.name, "started": run_spans[0]["started"],
+            "size_bytes": sum(span["size_bytes"] for span in run_spans),
+            "wall_s": max(span["wall_s"] for span in run_spans),
+            "cpu_s": sum(span["cpu_s"] for span in run_spans),
+            "peak_rss_kb": max((span["peak_rss_kb"] or 0) for span in run_spans) or None,
+        }]
+        timer = _Timer()
+        sql_content = "\n".join(part for part in parts if part)
+        notebook_file = write_formatted(sql_file, sql_content, final_folder, notebooks_folder)
+        spans.append(timer.span("notebook", notebook_file.name, notebook_file.stat().st_size))
+        return [(sql_file.name, notebook_file, "Succeeded", spans)]
+    except Exception as e:
+        return [(sql_file.name, None, f"Failed: {e}", [])]
+
+
+def start_formatting(sql_files, final_folder: Path, notebooks_folder: Path, workers: int = 0,
+                     split_threshold: int = 0, chunks_per_worker: int = 4):
+    """Submits formatting to a process pool and returns (executor, jobs).
+
+    Small files are grouped into chunks of similar total size. Files of split_threshold
+    bytes or more are split at GO lines and their batches spread over all workers.
+    Each job is a callable returning [(file name, notebook path or None, status, timing spans)];
+    callers must shut the executor down once every job has been called.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers)
+    small, large = [], []
+    for sql_file in sql_files:
+        is_large = split_threshold and sql_file.stat().st_size >= split_threshold
+        (large if is_large else small).append(sql_file)
+    jobs = []
+    for sql_file in large:
+        with open(sql_file, "r", encoding="utf-8", errors="replace") as f:
+            batches = split_batches(f.read())
+        futures = [executor.submit(format_batches_timed, run) for run in group_contiguous(batches, workers, lambda batch: len(batch[0]))]
+        jobs.append(partial(_finish_split, sql_file, futures, final_folder, notebooks_folder))
+    for chunk in chunk_by_size(small, workers * chunks_per_worker):
+        jobs.append(executor.submit(format_chunk, chunk, final_folder, notebooks_folder).result)
+    return executor, jobs
@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+
+from sql_formatter import BATCH_SEPARATOR, group_contiguous
+
+
+def split_pieces(sql_text: str):
+    """
+    Splits a script at batch boundaries, returning [(first line, text)] whose texts
+    concatenate back to sql_text. GO lines close a batch; returns None when the
+    script has no GO and so is a single batch.
+    """
+    pieces = []
+    current = []
+    start = 1
+    line_no = 0
+    for line_no, line in enumerate(sql_text.splitlines(keepends=True), 1):
+        current.append(line)
+        if BATCH_SEPARATOR.match(line):
+            pieces.append((start, "".join(current)))
+            current = []
+            start = line_no + 1
+    if current:
+        pieces.append((start, "".join(current)))
+    # Without a GO the script is one batch; splitting it at ';' would cut procedure bodies apart
+    return pieces if len(pieces) > 1 else None
+
+
+def group_pieces(pieces, max_parts: int):
+    """Merges neighbouring pieces into at most max_parts parts of similar size."""
+    runs = group_contiguous(pieces, max_parts, lambda piece: len(piece[1]))
+    return [(run[0][0], "".join(text for _, text in run)) for run in runs]
+
+
+def split_script(sql_file: Path, split_folder: Path, max_parts: int = 16):
+    """
+    Writes the parts of sql_file as <stem>.partNNNN.sql under split_folder.
+    Returns [{"path": part file, "input_lines": [first, last]}], or None when the
+    script has a single batch and cannot be split.
+    """
+    with open(sql_file, "r", encoding="utf-8", errors="replace") as f:
+        sql_text = f.read()
+    pieces = split_pieces(sql_text)
+    if pieces is None:
+        return None
+    parts = group_pieces(pieces, max_parts)
+    if len(parts) < 2:
+        return None
+    split_folder.mkdir(parents=True, exist_ok=True)
+    plan = []
+    for n, (start, text) in enumerate(parts):
+        part_file = split_folder / f"{sql_file.stem}.part{n:04d}.sql"
+        with open(part_file, "w", encoding="utf-8") as f:
+            f.write(text)
+        plan.append({"path": part_file, "input_lines": [start, start + max(text.count("\n"), 1) - 1]})
+    return plan
+
+
+def reassemble(sql_name: str, plan, part_statuses, parts_output: Path, converted_folder: Path):
+    """
+    Joins transpiled parts, in input order, into Converted_Code/<sql_name> and writes
+    Converted_Code/<stem>.sourcemap.json mapping output line ranges to input line ranges.
+    Returns "Success" only if every part transpiled.
+    """
+    failed = [part["path"].name for part in plan if part_statuses.get(part["path"].name) != "Success"]
+    if failed:
+        return "Failed"
+    source_map = {"source": sql_name, "parts": []}
+    line = 1
+    with open(converted_folder / sql_name, "w", encoding="utf-8") as out:
+        for part in plan:
+            with open(parts_output / part["path"].name, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            if text and not text.endswith("\n"):
+                text += "\n"
+            out.write(text)
+            lines = text.count("\n")
+            source_map["parts"].append({
+                "part": part["path"].name,
+                "input_lines": part["input_lines"],
+                "output_lines": [line, line + max(lines, 1) - 1],
+            })
+            line += lines
+    with open(converted_folder / f"{Path(sql_name).stem}.sourcemap.json", "w", encoding="utf-8") as f:
+        json.dump(source_map, f, indent=2)
+    return "Success"
@@ -1,5 +1,8 @@
 import os
 
+# Dialect folders created under dialects/; each may hold preprocessor/ and postprocessor/ plugins
+DIALECTS = ["synapse", "snowflake", "oracle", "teradata", "sqlserver", "generic"]
+
 def create_folder(path: str):
     """Creates a folder if it does not exist."""
     try:
@@ -33,13 +36,7 @@ def run_step3():
         f"{root_dir}/output/synapse",
 
         f"{root_dir}/dialects",
-        f"{root_dir}/dialects/synapse",
-        f"{root_dir}/dialects/snowflake",
-        f"{root_dir}/dialects/oracle",
-        f"{root_dir}/dialects/teradata",
-        f"{root_dir}/dialects/sqlserver",
-        f"{root_dir}/dialects/generic",
-
+    ] + [f"{root_dir}/dialects/{dialect}" for dialect in DIALECTS] + [
         f"{root_dir}/temp",
         f"{root_dir}/logs"
     ]
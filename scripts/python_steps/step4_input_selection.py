@@ -1,4 +1,5 @@
 import os
+from input_index import scan_inputs
 
 def run_step4():
     print("============================================================")
@@ -34,13 +35,23 @@ def run_step4():
     # ---------------------------------------------------------
     # 2. Scan input folder for selected dialect
     # ---------------------------------------------------------
-    input_folder = os.path.join(root_dir, "input", dialect)
+    # Input and output roots come from the config, as in steps 5 and 6
+    config_file = os.path.join(root_dir, "config", "config.yaml")
+    config = {}
+    if os.path.exists(config_file):
+        import yaml
+        with open(config_file, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    input_folder = os.path.join(config.get("source_path", os.path.join(root_dir, "input")), dialect)
+    output_folder = os.path.join(config.get("target_path", os.path.join(root_dir, "output")), dialect)
 
     if not os.path.exists(input_folder):
         print(f"ERROR: Input folder not found: {input_folder}")
         return
 
-    files = [f for f in os.listdir(input_folder) if os.path.isfile(os.path.join(input_folder, f))]
+    # Recursive, filtered by the input_* config keys, and shared with the later steps of the run
+    index_file = os.path.join(output_folder, "input_index.json")
+    files = [input_file.rel_path for input_file in scan_inputs(input_folder, config, index_file)]
 
     if not files:
         print(f"No files found in {input_folder}")
@@ -59,7 +70,7 @@ def run_step4():
         selected_files = files
         print("\nSelected: ALL files")
     else:
-        filename = input("Enter EXACT filename to run: ").strip()
+        filename = input("Enter EXACT filename to run (path relative to the input folder): ").strip()
         if filename not in files:
             print(f"ERROR: File '{filename}' not found in input folder.")
             return
@@ -69,7 +80,6 @@ def run_step4():
     # ---------------------------------------------------------
     # 4. Confirm output destination
     # ---------------------------------------------------------
-    output_folder = os.path.join(root_dir, "output", dialect)
     print(f"\nOutput will be generated in:\n{output_folder}")
 
     confirm = input("\nProceed with this output location? (y/n): ").strip().lower()
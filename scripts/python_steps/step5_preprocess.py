@@ -1,26 +1,69 @@
 import os
-import importlib.util
-import yaml
+import re
+import mmap
 from pathlib import Path
-
-def load_module(path):
-    spec = importlib.util.spec_from_file_location("module", path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
-def run_step5(dummy_input=None):
+from datetime import datetime
+from dialect_registry import get_registry
+from input_index import name_for, scan_inputs
+from run_report import get_report
+
+# A line holding only the T-SQL batch separator
+BATCH_SEPARATOR = re.compile(r"^\s*GO\s*;?\s*$", re.IGNORECASE)
+
+def iter_lines(path: Path, mmap_threshold: int):
+    """Yields decoded lines; files above mmap_threshold bytes are read through mmap."""
+    size = path.stat().st_size
+    if size == 0:
+        return
+    if size < mmap_threshold:
+        with open(path, "r", encoding="utf-8", newline="") as fh:
+            yield from fh
+        return
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for line in iter(mm.readline, b""):
+            yield line.decode("utf-8")
+
+def iter_statements(path: Path, mmap_threshold: int = 64 * 1024 * 1024, chunk_size: int = 1024 * 1024):
+    """Yields statement-sized chunks: a chunk ends after a GO line, or after a line
+    ending in ';' once it has grown past chunk_size characters."""
+    chunk = []
+    length = 0
+    for line in iter_lines(path, mmap_threshold):
+        chunk.append(line)
+        length += len(line)
+        if BATCH_SEPARATOR.match(line) or (length >= chunk_size and line.rstrip().endswith(";")):
+            yield "".join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield "".join(chunk)
+
+def preprocess_stream(pre_mod, chunks):
+    # Dialects may stream natively; otherwise each chunk goes through preprocess()
+    if hasattr(pre_mod, "preprocess_stream"):
+        return pre_mod.preprocess_stream(chunks)
+    return (pre_mod.preprocess(chunk) for chunk in chunks)
+
+def stream_file(pre_mod, file: Path, staged_file: Path, mmap_threshold: int):
+    with open(staged_file, "w", encoding="utf-8", newline="") as out:
+        for processed_chunk in preprocess_stream(pre_mod, iter_statements(file, mmap_threshold)):
+            out.write(processed_chunk)
+    return staged_file
+
+def run_step5(dummy_input=None, config_path=None, files=None):
+    # files: only these input files (e.g. the ones watch mode saw change) instead of the whole folder
     print("============================================================")
     print("Lakebridge Accelerator - Pre-process (Step 5)")
     print("============================================================")
 
     root_dir = Path(__file__).resolve().parents[2]
-    config_path = root_dir / "config" / "config.yaml"
+    config_path = Path(config_path) if config_path else root_dir / "config" / "config.yaml"
 
     if not config_path.exists():
         print(f"ERROR: Config file not found: {config_path}")
         return None
 
+    import yaml
     with open(config_path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f)
 
@@ -35,7 +78,15 @@ def run_step5(dummy_input=None):
         print(f"ERROR: Dialect input folder not found: {dialect_input_folder}")
         return None
 
-    files = sorted([p for p in dialect_input_folder.glob("*.sql") if p.is_file()])
+    # Inputs travel under flat .sql names (see input_index.staged_name); a scan of the
+    # whole tree goes through the run's shared input index
+    if files is not None:
+        files = sorted(Path(p) for p in files if Path(p).is_file())
+        names = {file: name_for(file, dialect_input_folder) for file in files}
+    else:
+        inputs = scan_inputs(dialect_input_folder, config, dialect_output_folder / "input_index.json")
+        files = [input_file.path for input_file in inputs]
+        names = {input_file.path: input_file.name for input_file in inputs}
 
     if not files:
         print(f"ERROR: No SQL files found in: {dialect_input_folder}")
@@ -44,24 +95,48 @@ def run_step5(dummy_input=None):
     print(f"Dialect: {dialect}")
     print(f"Input folder: {dialect_input_folder}")
     print(f"Output folder: {dialect_output_folder}")
-    print(f"Files detected: {[f.name for f in files]}")
+    print(f"Files detected: {[names[f] for f in files]}")
 
-    preprocessor_path = root_dir / "dialects" / dialect / "preprocessor" / "preprocess.py"
+    registry = get_registry(root_dir / "dialects")
+    preprocessor_path = registry.path(dialect, "preprocessor")
 
     if not preprocessor_path.exists():
         print(f"ERROR: Preprocessor not found: {preprocessor_path}")
         return None
 
     print(f"Using preprocessor: {preprocessor_path}")
-    pre_mod = load_module(str(preprocessor_path))
+    pre_mod = registry.load(dialect, "preprocessor")
+
+    # stream mode writes results to a staging folder and returns staged file paths
+    # instead of holding every processed text in memory
+    streaming = str(config.get("preprocess_mode", "memory")).lower() == "stream"
+    mmap_threshold = int(config.get("mmap_threshold_mb", 64)) * 1024 * 1024
+    staging_folder = None
+    if streaming:
+        staging_folder = root_dir / "temp" / "step5_preprocessed" / datetime.now().strftime("%Y%m%d_%H%M%S")
+        staging_folder.mkdir(parents=True, exist_ok=True)
+        print(f"Streaming preprocessed output to: {staging_folder}")
 
     processed_files = {}
-    for file in files:
-        print(f"\nPreprocessing file: {file.name}")
-        with open(file, "r", encoding="utf-8") as fh:
-            sql_text = fh.read()
-        processed_sql = pre_mod.preprocess(sql_text)
-        processed_files[str(file.resolve())] = processed_sql
+    if streaming:
+        for file in files:
+            print(f"\nPreprocessing file: {names[file]}")
+            with get_report().span("preprocess", names[file], file.stat().st_size):
+                staged_file = stream_file(pre_mod, file, staging_folder / names[file], mmap_threshold)
+                processed_files[str(file.resolve())] = str(staged_file)
+        if hasattr(pre_mod, "flush_report"):
+            pre_mod.flush_report()
+    else:
+        # One batch call, so the dialect can share its work across files; the registry
+        # (or the dialect's batch function) records a span per file
+        print(f"\nPreprocessing {len(files)} files")
+        texts = {}
+        for file in files:
+            with open(file, "r", encoding="utf-8") as fh:
+                texts[names[file]] = fh.read()
+        processed = registry.preprocess_many(dialect, texts)
+        for file in files:
+            processed_files[str(file.resolve())] = processed[names[file]]
 
     print("\n============================================================")
     print("Pre-process Completed (Step 5)")
@@ -69,8 +144,12 @@ def run_step5(dummy_input=None):
 
     return {
         "dialect": dialect,
+        "config": config,
         "processed_files": processed_files,
-        "output_folder": str(dialect_output_folder)
+        "names": {str(file.resolve()): names[file] for file in files},
+        "output_folder": str(dialect_output_folder),
+        "staged": streaming,
+        "staging_folder": str(staging_folder) if staging_folder else None
     }
 
 if __name__ == "__main__":
@@ -1,16 +1,33 @@
 #!/usr/bin/env python3
-import argparse
 import shutil
 import subprocess
 import sys
 import logging
-import yaml
 import os
 from pathlib import Path
 from datetime import datetime
-import sqlparse
 import csv
-import urllib.request
+import threading
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from analyzer_report import merge_reports, metrics_by_file, read_file_statuses
+from command_runner import CommandResult, cancel_all, configure_timeouts, get_timeouts, run_command
+from dialect_registry import get_registry
+from input_index import get_index, options_from_config
+from build_cache import BuildCache, cache_key, get_lakebridge_version, sha256_file
+from lakebridge_worker import WorkerTimeout, WorkerUnavailable, get_worker_pool, start_worker_pool, stop_worker_pool
+from pipeline import Pipeline, Stage
+from sql_formatter import chunk_by_size, format_chunk, start_formatting
+from sql_splitter import reassemble, split_script
+from run_journal import RunJournal
+from run_report import get_report
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+OUTPUT_TAIL_CHARS = 4000
+# Build cache artifacts that only some builds produce
+OPTIONAL_ARTIFACTS = ("sourcemap",)
 
 def setup_logging(metadata_folder: Path):
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -18,7 +35,8 @@ def setup_logging(metadata_folder: Path):
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[logging.FileHandler(log_file, encoding="utf-8")]
+        handlers=[logging.FileHandler(log_file, encoding="utf-8")],
+        force=True  # a warm process (watch mode) logs each run to its own file
     )
     logging.info(f"Logging initialized. Log file: {log_file}")
     return log_file
@@ -31,72 +49,586 @@ def check_cli():
         print("ERROR: 'databricks' CLI not found in PATH. Install/configure it and try again.", file=sys.stderr)
         sys.exit(2)
 
-def run_cmd(cmd_str: str, title: str, log_file=None, ignore_failure=False):
+def input_size(path: Path):
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.glob("*.sql"))
+    return path.stat().st_size if path.exists() else None
+
+def log_failure(log_file, result: CommandResult, title: str):
+    msg = f"{title} timed out after {result.timeout_s:.0f}s" if result.timed_out \
+        else f"{title} failed with exit code {result.returncode}"
+    if log_file:
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(msg + "\n")
+            tail = (result.stderr or result.stdout).strip()
+            if tail:
+                f.write(tail[-OUTPUT_TAIL_CHARS:] + "\n")
+    return msg
+
+def run_cmd(argv, title: str, log_file=None, ignore_failure=False, stage="command", size_bytes=None, timeout=None):
+    # Every call is recorded as a span (wall/CPU/peak RSS of the child) in the run report.
+    # Returns the CommandResult, which is truthy when the command succeeded.
     print(f"\n=== {title} ===")
-    print("Command:", cmd_str)
+    print("Command:", subprocess.list2cmdline([str(arg) for arg in argv]))
+    started = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    if timeout is None:
+        timeout = get_timeouts().timeout(size_bytes)
+    result = run_command(argv, timeout=timeout)
+    get_report().add(stage, title, result.status, size_bytes, result.wall_s, result.cpu_s, result.peak_rss_kb,
+                     started)
+    if result.ok:
+        get_timeouts().observe(size_bytes, result.wall_s)
+        return result
+    msg = log_failure(log_file, result, title)
+    if not ignore_failure:
+        print(msg, file=sys.stderr)
+        if result.stderr.strip():
+            print(result.stderr.strip()[-OUTPUT_TAIL_CHARS:], file=sys.stderr)
+        sys.exit(3 if result.timed_out else result.returncode or 1)
+    return result
+
+def run_in_worker(pool, argv, title: str, log_file=None, stage="command", size_bytes=None):
+    # Same reporting and result as run_cmd, for a command served by a warm lakebridge worker
+    print(f"\n=== {title} (worker) ===")
+    started = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    timeout = get_timeouts().timeout(size_bytes)
+    wall = time.perf_counter()
     try:
-        result = subprocess.run(cmd_str, shell=True, timeout=21600)
-        if result.returncode != 0:
-            msg = f"{title} failed with exit code {result.returncode}"
-            if log_file:
-                with open(log_file, "a", encoding="utf-8") as f:
-                    f.write(msg + "\n")
-            if not ignore_failure:
-                print(msg, file=sys.stderr)
-                sys.exit(result.returncode)
-            return False
-        return True
-    except subprocess.TimeoutExpired:
-        msg = f"{title} timed out"
-        if log_file:
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(msg + "\n")
-        if not ignore_failure:
-            print(msg, file=sys.stderr)
-            sys.exit(3)
+        response = pool.run(argv[1:], timeout=timeout)
+    except WorkerTimeout:
+        # The hung worker was stopped; the file fails as a timed-out CLI call would, without a CLI retry
+        result = CommandResult(argv=argv, wall_s=time.perf_counter() - wall, timeout_s=timeout, timed_out=True,
+                               extra={"backend": "worker"})
+    else:
+        result = CommandResult(argv=argv, returncode=response["rc"], stdout=response["stdout"] or "",
+                               stderr=response["stderr"] or "", wall_s=response["wall_s"], cpu_s=response["cpu_s"],
+                               peak_rss_kb=response["peak_rss_kb"], timeout_s=timeout, extra={"backend": "worker"})
+    get_report().add(stage, title, result.status, size_bytes, result.wall_s, result.cpu_s, result.peak_rss_kb,
+                     started)
+    if result.ok:
+        get_timeouts().observe(size_bytes, result.wall_s)
+    else:
+        log_failure(log_file, result, title)
+    return result
+
+def transpile_file(sql_file: Path, dialect: str, output_folder: Path, global_flags, log_file=None, title=None):
+    # sql_file may also be a directory: the CLI then transpiles every file in it
+    argv = ["databricks", "labs", "lakebridge", "transpile",
+            "--input-source", str(sql_file),
+            "--source-dialect", dialect,
+            "--output-folder", str(output_folder)] + global_flags
+    title = title or f"Transpile {sql_file.name}"
+    pool = get_worker_pool()
+    if pool is not None:
+        try:
+            return run_in_worker(pool, argv, title, log_file, stage="transpile", size_bytes=input_size(sql_file))
+        except WorkerUnavailable as e:
+            # Only a crashed or unstartable worker; run_in_worker reports timeouts as failed files
+            logging.warning(f"Transpile worker failed ({e}), using the CLI for {sql_file.name}")
+    return run_cmd(argv, title, log_file=log_file, ignore_failure=True, stage="transpile",
+                   size_bytes=input_size(sql_file))
+
+def collect_staged_output(staging_folder: Path, converted_folder: Path):
+    # Move everything a worker produced into the shared Converted_Code folder
+    for staged in sorted(staging_folder.rglob("*")):
+        if not staged.is_file():
+            continue
+        dest = converted_folder / staged.relative_to(staging_folder)
+        ensure_dirs(dest.parent)
+        os.replace(staged, dest)
+
+def run_transpile_pool(sql_files, dialect: str, converted_folder: Path, staging_root: Path,
+                       global_flags, log_file=None, max_workers: int = 4, on_status=None):
+    """Transpile files concurrently, each worker writing into its own staging folder.
+
+    Returns {file name: "Success"/"Failed"} in the order of ``sql_files``.
+    on_status(name, status, error) is called as soon as each file finishes.
+    """
+    worker_state = threading.local()
+    worker_ids = itertools.count()
+
+    def _transpile(sql_file: Path):
+        if not hasattr(worker_state, "staging"):
+            worker_state.staging = staging_root / f"worker_{next(worker_ids)}"
+            ensure_dirs(worker_state.staging)
+        try:
+            result = transpile_file(sql_file, dialect, worker_state.staging, global_flags, log_file)
+            error = result.error_summary()
+        except Exception as e:
+            logging.error(f"Transpile failed for {sql_file.name}: {e}")
+            result, error = None, str(e)
+        collect_staged_output(worker_state.staging, converted_folder)
+        status = "Success" if result else "Failed"
+        if on_status:
+            on_status(sql_file.name, status, error)
+        return status
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [(sql_file.name, pool.submit(_transpile, sql_file)) for sql_file in sql_files]
+        try:
+            return {name: future.result() for name, future in futures}
+        except KeyboardInterrupt:
+            # Drop the queued files and kill the running commands instead of waiting for them
+            pool.shutdown(wait=False, cancel_futures=True)
+            cancel_all()
+            raise
+
+def transpile_batch(batch, label: str, dialect: str, converted_folder: Path, staging_root: Path,
+                    global_flags, log_file=None, on_status=None):
+    """Transpile a list of files with a single CLI call on a staged input directory.
+
+    If the call fails the batch is split in half and each half retried, so one
+    bad file only fails itself. Per-file status comes from the outputs produced.
+    """
+    batch_input = staging_root / label / "input"
+    batch_output = staging_root / label / "output"
+    ensure_dirs(batch_input)
+    ensure_dirs(batch_output)
+    for sql_file in batch:
+        shutil.copy2(sql_file, batch_input / sql_file.name)
+    result = transpile_file(batch_input, dialect, batch_output, global_flags, log_file,
+                            title=f"Transpile {label} ({len(batch)} files)")
+    if not result and len(batch) > 1:
+        shutil.rmtree(staging_root / label, ignore_errors=True)
+        mid = len(batch) // 2
+        statuses = transpile_batch(batch[:mid], f"{label}a", dialect, converted_folder,
+                                   staging_root, global_flags, log_file, on_status)
+        statuses.update(transpile_batch(batch[mid:], f"{label}b", dialect, converted_folder,
+                                        staging_root, global_flags, log_file, on_status))
+        return statuses
+    produced = {p.name for p in batch_output.rglob("*") if p.is_file()}
+    collect_staged_output(batch_output, converted_folder)
+    statuses = {
+        sql_file.name: "Success" if result and sql_file.name in produced else "Failed"
+        for sql_file in batch
+    }
+    if on_status:
+        for name, status in statuses.items():
+            on_status(name, status, "" if status == "Success" else result.error_summary() or "no output produced")
+    return statuses
+
+def run_transpile_batches(sql_files, dialect: str, converted_folder: Path, staging_root: Path,
+                          global_flags, log_file=None, batch_size: int = 50, max_workers: int = 1,
+                          on_status=None, cost_model=None):
+    if cost_model is not None:
+        batches = cost_model.pack(sql_files, batch_size)
+    else:
+        batches = [sql_files[i:i + batch_size] for i in range(0, len(sql_files), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [
+            pool.submit(transpile_batch, batch, f"batch_{n:04d}", dialect, converted_folder,
+                        staging_root, global_flags, log_file, on_status)
+            for n, batch in enumerate(batches)
+        ]
+        statuses = {}
+        for future in futures:
+            statuses.update(future.result())
+    return {sql_file.name: statuses.get(sql_file.name, "Failed") for sql_file in sql_files}
+
+def run_transpile(sql_files, dialect: str, output_folder: Path, staging_root: Path, global_flags,
+                  log_file=None, transpile_mode: str = "file", batch_size: int = 50, max_workers: int = 1,
+                  on_status=None, cost_model=None):
+    """Transpiles sql_files into output_folder using the configured mode; returns {name: status}.
+
+    on_status(name, status, error) is called as each file finishes, e.g. to journal progress;
+    error is the last line the command printed when it failed.
+    With a cost_model, the pool starts the costliest files first and batches are
+    packed to similar predicted cost.
+    """
+    statuses = {}
+    if not sql_files:
+        return statuses
+    if transpile_mode == "batch":
+        print(f"\nStarting batched transpile ({batch_size} files per call, {max_workers} workers)...")
+        statuses = run_transpile_batches(
+            sql_files, dialect, output_folder, staging_root, global_flags,
+            log_file=log_file, batch_size=batch_size, max_workers=max_workers, on_status=on_status,
+            cost_model=cost_model
+        )
+    elif max_workers > 1:
+        print(f"\nStarting transpile per SQL file ({max_workers} workers)...")
+        statuses = run_transpile_pool(
+            cost_model.order(sql_files) if cost_model is not None else sql_files, dialect, output_folder, staging_root,
+            global_flags, log_file=log_file, max_workers=max_workers, on_status=on_status
+        )
+    else:
+        print("\nStarting transpile per SQL file...")
+        for sql_file in sql_files:
+            try:
+                result = transpile_file(sql_file, dialect, output_folder, global_flags, log_file)
+                statuses[sql_file.name] = "Success" if result else "Failed"
+                error = result.error_summary()
+            except Exception as e:
+                logging.error(f"Transpile failed for {sql_file.name}: {e}")
+                statuses[sql_file.name] = "Failed"
+                error = str(e)
+            if on_status:
+                on_status(sql_file.name, statuses[sql_file.name], error)
+    shutil.rmtree(staging_root, ignore_errors=True)
+    return statuses
+
+def instantiate_duplicate(dedup_plan, name: str, converted_folder: Path, journal, file_shas):
+    # Reuses the representative's converted output for a duplicate; False means transpile it on its own
+    rep = dedup_plan.duplicates[name]
+    if journal.status(rep, "transpile", file_shas[rep]) != "Success" \
+            or not dedup_plan.instantiate(name, converted_folder):
         return False
+    journal.record(name, "transpile", "Success", file_shas[name], duplicate_of=rep)
+    return True
+
+def stage_files(sql_files, folder: Path):
+    # Hard-links (or copies) sql_files into folder so the CLI sees only those files
+    ensure_dirs(folder)
+    for sql_file in sql_files:
+        try:
+            os.link(sql_file, folder / sql_file.name)
+        except OSError:
+            shutil.copy2(sql_file, folder / sql_file.name)
+    return folder
+
+def analyze_folder(source_dir: Path, report_file: Path, dialect: str, global_flags, log_file=None,
+                   title="Lakebridge Analyze", ignore_failure=False, size_bytes=None):
+    argv = ["databricks", "labs", "lakebridge", "analyze",
+            "--source-directory", str(source_dir),
+            "--report-file", str(report_file),
+            "--source-tech", dialect] + global_flags
+    return run_cmd(argv, title, log_file=log_file, ignore_failure=ignore_failure, stage="analyze",
+                   size_bytes=size_bytes)
+
+def run_analyze(sql_files, source_dir: Path, report_file: Path, dialect: str, global_flags, staging_root: Path,
+                log_file=None, shards: int = 1, total_files=None):
+    """
+    Analyzes sql_files and returns {file name: status} taken from the report rows
+    ("Success"/"Failed"/"Missing"), or from the exit code if the report has no per-file rows.
+
+    With shards > 1 the files are partitioned by size into shard folders that are
+    analyzed concurrently; a failed shard fails only its own files and the shard
+    reports are merged into report_file. A single analyze call exits on failure.
+    total_files is the number of input files in source_dir; when sql_files are fewer
+    (or it is unknown) they are staged into a folder of their own.
+    """
+    names = [sql_file.name for sql_file in sql_files]
+    size_bytes = sum(sql_file.stat().st_size for sql_file in sql_files)
+    if shards <= 1 or len(sql_files) < 2:
+        if total_files is None or len(sql_files) < total_files:
+            source_dir = stage_files(sql_files, staging_root)
+        analyze_folder(source_dir, report_file, dialect, global_flags, log_file, size_bytes=size_bytes)
+        return read_file_statuses(report_file, names) or {name: "Success" for name in names}
+
+    groups = chunk_by_size(sql_files, shards)
+    print(f"Analyzing {len(sql_files)} files in {len(groups)} shards")
+    statuses = {}
+    shard_reports = []
+    with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+        for shard_report, shard_statuses in pool.map(
+            lambda n, group: analyze_shard(group, f"shard_{n:02d}", dialect, global_flags, staging_root, log_file),
+            range(len(groups)), groups
+        ):
+            statuses.update(shard_statuses)
+            if shard_report.exists():
+                shard_reports.append(shard_report)
+    merge_shard_reports(shard_reports, report_file)
+    return {name: statuses[name] for name in names}
+
+def analyze_shard(sql_files, label: str, dialect: str, global_flags, staging_root: Path, log_file=None):
+    """Analyzes sql_files staged as one shard; returns (shard report, {file name: status})."""
+    shard_dir = stage_files(sql_files, staging_root / label)
+    shard_report = staging_root / f"{label}.xlsx"
+    ok = analyze_folder(shard_dir, shard_report, dialect, global_flags, log_file,
+                        title=f"Lakebridge Analyze {label} ({len(sql_files)} files)", ignore_failure=True,
+                        size_bytes=sum(sql_file.stat().st_size for sql_file in sql_files))
+    names = [sql_file.name for sql_file in sql_files]
+    if not ok:
+        return shard_report, {name: "Failed" for name in names}
+    return shard_report, read_file_statuses(shard_report, names) or {name: "Success" for name in names}
+
+def merge_shard_reports(shard_reports, report_file: Path):
+    if not shard_reports:
+        return
+    if merge_reports(shard_reports, report_file):
+        print(f"Merged {len(shard_reports)} shard reports into {report_file}")
+    else:
+        for shard_report in shard_reports:
+            shutil.copy2(shard_report, report_file.with_name(f"{report_file.stem}_{shard_report.stem}.xlsx"))
+        print(f"Could not merge shard reports, kept them next to {report_file}", file=sys.stderr)
 
-def validate_input_folder(source_path: Path):
+def validate_input_folder(source_path: Path, sql_files):
     if not source_path.exists():
         print(f"ERROR: source path not found: {source_path}", file=sys.stderr)
         sys.exit(4)
-    if not any(source_path.glob("*.sql")):
+    if not sql_files:
         print(f"WARNING: No .sql files found in {source_path}")
 
-def process_sql_files(converted_folder: Path, notebooks_folder: Path, metadata_folder: Path):
+def postprocess_converted(sql_files, dialect: str):
+    # Runs the dialect postprocessor over the transpiled files in one batch call, rewriting them in place
+    registry = get_registry(ROOT_DIR / "dialects")
+    if not sql_files or registry.load(dialect, "postprocessor") is None:
+        return
+    texts = {}
+    for sql_file in sql_files:
+        with open(sql_file, "r", encoding="utf-8", errors="replace", newline="") as f:
+            texts[sql_file.name] = f.read()
+    try:
+        label = sql_files[0].name if len(sql_files) == 1 else f"{len(sql_files)} files"
+        with get_report().span("postprocess", label, sum(len(t) for t in texts.values())):
+            processed = registry.postprocess_many(dialect, texts)
+    except Exception as e:
+        logging.error(f"Postprocessor failed, keeping the transpiled SQL as-is: {e}")
+        print(f"WARNING: {dialect} postprocessor failed: {e}", file=sys.stderr)
+        return
+    for sql_file in sql_files:
+        sql_text = processed.get(sql_file.name, texts[sql_file.name])
+        if sql_text != texts[sql_file.name]:
+            with open(sql_file, "w", encoding="utf-8", newline="") as f:
+                f.write(sql_text)
+
+def process_sql_files(converted_folder: Path, notebooks_folder: Path, metadata_folder: Path, cached_files=None,
+                      log_file=None, upload_options=None, format_workers: int = 1, format_split_threshold: int = 0,
+                      on_status=None, dialect=None, file_names=None):
+    # cached_files: names whose formatted SQL and notebook already exist (build cache or resumed run)
+    # file_names: this run's files; outputs of earlier runs in converted_folder are left alone
+    # on_status(name, stage, status) is called per file for the format, notebook and upload stages
+    cached_files = cached_files or set()
     final_folder = converted_folder.parent / "Final_Formatted"
     ensure_dirs(final_folder)
     ensure_dirs(notebooks_folder)
-    summary = []
-    for sql_file in converted_folder.glob("*.sql"):
-        status = "Succeeded"
+    if log_file is None:
+        log_file = metadata_folder / f"lakebridge_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    if file_names is None:
+        sql_files = sorted(converted_folder.glob("*.sql"))
+    else:
+        sql_files = sorted(converted_folder / name for name in set(file_names) if (converted_folder / name).is_file())
+    to_format = [sql_file for sql_file in sql_files if sql_file.name not in cached_files]
+    if dialect:
+        postprocess_converted(to_format, dialect)
+    # Each job returns [(file name, notebook path or None, status, timing spans)]
+    jobs = [lambda: [
+        (sql_file.name, notebooks_folder / (sql_file.stem + ".py"), "Succeeded", [])
+        for sql_file in sql_files if sql_file.name in cached_files
+    ]]
+    executor = None
+    if format_workers > 1 and len(to_format) > 1:
+        executor, format_jobs = start_formatting(to_format, final_folder, notebooks_folder,
+                                                 format_workers, format_split_threshold)
+        jobs += format_jobs
+    else:
+        jobs += [partial(format_chunk, [sql_file], final_folder, notebooks_folder, format_split_threshold)
+                 for sql_file in to_format]
+    statuses = {}
+    upload_options = dict(upload_options or {})
+    if on_status:
+        notebook_sources = {sql_file.stem + ".py": sql_file.name for sql_file in sql_files}
+        upload_options["on_result"] = lambda notebook_name, status: on_status(
+            notebook_sources.get(notebook_name, notebook_name), "upload", status)
+
+    def _prepare(job):
+        # Runs in a worker thread while earlier notebooks are still uploading
+        notebooks = []
+        for name, notebook_file, status, spans in job():
+            statuses[name] = status
+            for span in spans:
+                get_report().add(**span)
+            if on_status:
+                on_status(name, "format", status)
+                on_status(name, "notebook", status)
+            if notebook_file is None:
+                logging.error(f"Error processing {name}: {status}")
+            else:
+                notebooks.append(notebook_file)
+        return notebooks
+
+    print(f"\n=== Format and upload {len(sql_files)} notebooks ===")
+    from notebook_upload import run_upload_stage
+    try:
+        uploads = run_upload_stage(jobs, _prepare, log_file=log_file, **upload_options)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    failed_uploads = [name for name, ok in uploads.items() if not ok]
+    if failed_uploads:
+        print(f"{len(failed_uploads)} notebook upload(s) failed, see {log_file}", file=sys.stderr)
+    return [(sql_file.name, statuses.get(sql_file.name, "Failed")) for sql_file in sql_files]
+
+def run_pipeline(sql_files, dialect: str, target_path: Path, staging_root: Path, global_flags, journal, file_shas,
+                 analyze_names=(), transpile_names=(), skip_format=(), log_file=None, analyzer_report_file=None,
+                 run_transpiler=True, transpile_mode="file", batch_size=50, max_workers=1, analyzer_workers=1,
+                 split_threshold=0, split_max_parts=16, format_workers=1, format_split_threshold=0,
+                 upload_options=None, queue_size=64, dedup_plan=None):
+    """
+    Moves each file through analyze -> transpile -> format/notebook -> upload on its own,
+    with bounded queues between the stages and a worker count per stage, instead of
+    finishing every file in one phase before the next phase starts.
+
+    analyze_names / transpile_names are the files still needing those stages and
+    skip_format the files whose notebooks already exist. Statuses are journaled as
+    they settle; returns {name: analyzer status}, {name: post-process status}.
+
+    With a dedup_plan, a duplicate reuses its representative's output when the
+    representative is already being transpiled; otherwise it is transpiled itself.
+    """
+    converted_folder = target_path / "Converted_Code"
+    notebooks_folder = target_path / "Databricks_Notebooks"
+    final_folder = target_path / "Final_Formatted"
+    for folder in (converted_folder, notebooks_folder, final_folder):
+        ensure_dirs(folder)
+    analyzer_status = {}
+    post_process = {}
+    shard_reports = []
+    calls = itertools.count()
+
+    def _analyze(batch):
+        todo = [item for item in batch if item["name"] in analyze_names]
+        if todo:
+            shard_report, statuses = analyze_shard([item["file"] for item in todo], f"shard_{next(calls):04d}",
+                                                   dialect, global_flags, staging_root / "analyze", log_file)
+            if shard_report.exists():
+                shard_reports.append(shard_report)
+            for name, status in statuses.items():
+                analyzer_status[name] = status
+                journal.record(name, "analyze", status, file_shas[name])
+        return batch if run_transpiler else []
+
+    duplicates = dedup_plan.duplicates if dedup_plan is not None else {}
+    rep_started = set()
+    rep_done = {rep: threading.Event() for rep in set(duplicates.values())}
+
+    def _record_transpile(name, status, error=""):
+        journal.record(name, "transpile", status, file_shas[name], **({"error": error} if error else {}))
+        journal.record(name, "build", "Rebuilt", file_shas[name])
+
+    def _transpile(batch):
+        reps = [item["name"] for item in batch if item["name"] in rep_done and item["name"] in transpile_names]
+        rep_started.update(reps)
         try:
-            with open(sql_file, "r", encoding="utf-8", errors="replace") as f:
-                sql_content = f.read()
-            sql_content = sqlparse.format(sql_content, reindent=True, keyword_case="upper")
-            final_file = final_folder / sql_file.name
-            with open(final_file, "w", encoding="utf-8") as f:
-                f.write(sql_content)
-            notebook_file = notebooks_folder / (sql_file.stem + ".py")
-            with open(notebook_file, "w", encoding="utf-8") as f:
-                f.write("# Databricks notebook source\n")
-                f.write(f'"""\nAuto-generated from {sql_file.name}\n"""\n\n')
-                f.write('sql_query = """\n')
-                f.write(sql_content)
-                f.write('\n"""\n')
-                f.write("display(spark.sql(sql_query))\n")
-            upload_cmd = (
-                f'databricks workspace import '
-                f'--file "{notebook_file}" '
-                f'"/Shared/{notebook_file.name}" '
-                f'--language PYTHON --overwrite'
-            )
-            run_cmd(upload_cmd, f"Upload Notebook {notebook_file.name}", log_file=metadata_folder / f"lakebridge_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt", ignore_failure=True)
-        except Exception as e:
-            status = f"Failed: {e}"
-            logging.error(f"Error processing {sql_file.name}: {e}")
-        summary.append((sql_file.name, status))
-    return summary
+            # A batch holding representatives never waits, so two workers can't wait on each other
+            return _transpile_batch(batch, wait_for_reps=not reps)
+        finally:
+            for name in reps:
+                rep_done[name].set()
+
+    def _transpile_batch(batch, wait_for_reps):
+        whole = []
+        for item in batch:
+            sql_file = item["file"]
+            if item["name"] not in transpile_names:
+                continue
+            rep = duplicates.get(item["name"])
+            # Only wait for a representative some worker has already picked up
+            if rep is not None and wait_for_reps and rep in rep_started:
+                rep_done[rep].wait()
+                if instantiate_duplicate(dedup_plan, item["name"], converted_folder, journal, file_shas):
+                    journal.record(item["name"], "build", "Rebuilt", file_shas[item["name"]])
+                    continue
+            plan = None
+            if split_threshold and sql_file.stat().st_size >= split_threshold:
+                plan = split_script(sql_file, staging_root / "split" / "input", split_max_parts)
+            if plan is None:
+                whole.append(sql_file)
+                continue
+            parts_output = staging_root / "split" / "output" / sql_file.stem
+            ensure_dirs(parts_output)
+            part_statuses = {}
+            errors = []
+            for part in plan:
+                result = transpile_file(part["path"], dialect, parts_output, global_flags, log_file)
+                part_statuses[part["path"].name] = "Success" if result else "Failed"
+                if not result:
+                    errors.append(f"{part['path'].name}: {result.error_summary()}")
+            status = reassemble(item["name"], plan, part_statuses, parts_output, converted_folder)
+            _record_transpile(item["name"], status, "; ".join(errors) if status != "Success" else "")
+        if whole:
+            label = f"call_{next(calls):04d}"
+            if transpile_mode == "batch":
+                transpile_batch(whole, label, dialect, converted_folder, staging_root / "transpile",
+                                global_flags, log_file, on_status=_record_transpile)
+            else:
+                # Each call writes to its own staging folder so concurrent calls don't collide
+                for sql_file in whole:
+                    call_output = staging_root / "transpile" / label
+                    ensure_dirs(call_output)
+                    result = transpile_file(sql_file, dialect, call_output, global_flags, log_file)
+                    collect_staged_output(call_output, converted_folder)
+                    _record_transpile(sql_file.name, "Success" if result else "Failed", result.error_summary())
+            shutil.rmtree(staging_root / "transpile" / label, ignore_errors=True)
+        return [item for item in batch
+                if journal.status(item["name"], "transpile", file_shas[item["name"]]) == "Success"]
+
+    # Imported here so runs without a pipeline don't pay for asyncio and multiprocessing at startup
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+    from notebook_upload import NotebookUploader
+
+    format_pool = ProcessPoolExecutor(max_workers=format_workers) if format_workers > 1 else None
+    if format_pool is not None:
+        # Start the format processes now: forked later, while a transpile thread is inside
+        # Popen, a worker would inherit the pipe Popen waits on and block it forever
+        format_pool.submit(int).result()
+
+    def _format(batch):
+        ready = []
+        postprocess_converted([converted_folder / item["name"] for item in batch if item["name"] not in skip_format
+                               and (converted_folder / item["name"]).exists()], dialect)
+        for item in batch:
+            name = item["name"]
+            if name in skip_format:
+                results = [(name, notebooks_folder / (item["file"].stem + ".py"), "Succeeded", [])]
+            else:
+                args = ([converted_folder / name], final_folder, notebooks_folder, format_split_threshold)
+                results = format_pool.submit(format_chunk, *args).result() if format_pool else format_chunk(*args)
+            for result_name, notebook_file, status, spans in results:
+                for span in spans:
+                    get_report().add(**span)
+                post_process[result_name] = status
+                journal.record(result_name, "format", status, file_shas[result_name])
+                journal.record(result_name, "notebook", status, file_shas[result_name])
+                if notebook_file is None:
+                    logging.error(f"Error processing {result_name}: {status}")
+                else:
+                    ready.append(dict(item, notebook=notebook_file))
+        return ready
+
+    uploader = NotebookUploader(
+        log_file=log_file,
+        on_result=lambda notebook_name, status: journal.record(
+            Path(notebook_name).stem + ".sql", "upload", status, file_shas.get(Path(notebook_name).stem + ".sql")),
+        **(upload_options or {})
+    )
+
+    def _upload(batch):
+        # Each upload worker thread runs the uploader's coroutine on its own event loop
+        return [item for item in batch if asyncio.run(uploader.upload(item["notebook"]))]
+
+    pipeline = Pipeline([
+        Stage("analyze", _analyze, workers=analyzer_workers, batch_size=batch_size),
+        Stage("transpile", _transpile, workers=max_workers,
+              batch_size=batch_size if transpile_mode == "batch" else 1),
+        Stage("format", _format, workers=format_workers),
+        Stage("upload", _upload, workers=uploader.max_concurrency),
+    ], queue_size=queue_size)
+    print(f"\n=== Pipelined run of {len(sql_files)} files ===")
+    try:
+        uploaded = pipeline.run({"name": sql_file.name, "file": sql_file} for sql_file in sql_files)
+    finally:
+        if format_pool is not None:
+            format_pool.shutdown()
+        uploader.save_manifest()
+    if analyzer_report_file is not None:
+        merge_shard_reports(sorted(shard_reports), analyzer_report_file)
+    print(uploader.stats_line())
+    if pipeline.first_output_s is not None:
+        print(f"First notebook uploaded after {pipeline.first_output_s:.1f}s; {len(uploaded)} uploaded in total")
+    print("Stage busy time: " + ", ".join(f"{name} {busy:.1f}s" for name, busy in pipeline.stage_busy_s.items()))
+    return analyzer_status, post_process
+
+def cache_artifacts(target_path: Path, file_name: str):
+    # Output files produced for one source script, as stored in the build cache
+    return {
+        "converted": target_path / "Converted_Code" / file_name,
+        "formatted": target_path / "Final_Formatted" / file_name,
+        "notebook": target_path / "Databricks_Notebooks" / (Path(file_name).stem + ".py"),
+        # Only scripts transpiled in parts have a source map (see sql_splitter.reassemble)
+        "sourcemap": target_path / "Converted_Code" / (Path(file_name).stem + ".sourcemap.json"),
+    }
 
 def create_initial_structure(root_dir: Path = Path("lakebridge")):
     supported_dialects = [
@@ -121,13 +653,30 @@ def create_initial_structure(root_dir: Path = Path("lakebridge")):
 def is_first_time_setup(root_dir: Path = Path("lakebridge")):
     return not root_dir.exists() or not any(root_dir.iterdir())
 
-def run_step6(config_path_str: str):
-    config_path = Path(config_path_str)
-    if not config_path.exists():
-        print(f"Config file {config_path} not found.", file=sys.stderr)
-        sys.exit(10)
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
+def run_step6(config_path_str: str, force_upload: bool = False, context=None, resume: bool = False,
+              keep_warm: bool = False):
+    """
+    context: optional run_context.RunContext from step5. When given, its config is used
+    as-is and the preprocessed SQL it carries is analyzed and transpiled instead of
+    the raw files under source_path.
+
+    Per-file progress is journaled to metadata/<date>/run_journal_<ts>.jsonl. With
+    resume, the latest journal is reopened and files whose stages completed for the
+    same input are not analyzed, transpiled or formatted again.
+
+    keep_warm leaves the transpile workers running for the next call in this process
+    (watch mode); the caller stops them with stop_worker_pool().
+    """
+    if context is not None:
+        config = context.config
+    else:
+        config_path = Path(config_path_str)
+        if not config_path.exists():
+            print(f"Config file {config_path} not found.", file=sys.stderr)
+            sys.exit(10)
+        import yaml
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
     dialect = config.get("dialect", "synapse")
     source_root = Path(config.get("source_path", "lakebridge/input"))
     target_root = Path(config.get("target_path", "lakebridge/output"))
@@ -139,6 +688,37 @@ def run_step6(config_path_str: str):
     run_validation = config.get("run_validation", True)
     run_analyzer = config.get("run_analyzer", True)
     run_transpiler = config.get("run_transpiler", True)
+    max_workers = int(config.get("max_workers", 1) or 1)
+    transpile_mode = str(config.get("transpile_mode", "file")).lower()
+    batch_size = int(config.get("batch_size", 50) or 50)
+    cache_enabled = config.get("cache_enabled", True)
+    cache_max_mb = int(config.get("cache_max_mb", 512) or 512)
+    split_threshold = int(config.get("split_threshold_kb", 1024) or 0) * 1024
+    split_max_parts = int(config.get("split_max_parts", 16) or 16)
+    schedule_by_cost = config.get("schedule_by_cost", True)
+    transpile_backend = str(config.get("transpile_backend", "cli")).lower()
+    worker_options = {
+        "backend": config.get("worker_backend") or "lakebridge",
+        "python": config.get("worker_python") or None,
+    }
+    # Commands get a timeout scaled to their input size, tightened once real timings are seen
+    configure_timeouts(min_s=float(config.get("command_timeout_min_s", 600)),
+                       max_s=float(config.get("command_timeout_max_s", 21600)),
+                       per_mb_s=float(config.get("command_timeout_per_mb_s", 600)))
+    pipelined = str(config.get("scheduler", "phased")).lower() == "pipeline"
+    dedup_mode = str(config.get("dedup_mode", "exact")).lower()
+    pipeline_queue_size = int(config.get("pipeline_queue_size", 64) or 64)
+    analyzer_mode = str(config.get("analyzer_mode", "single")).lower()
+    analyzer_shards = int(config.get("analyzer_shards", 4) or 1) if analyzer_mode == "sharded" else 1
+    format_workers = int(config.get("format_workers", 1) or 1)
+    format_split_threshold = int(config.get("format_split_threshold_kb", 512) or 0) * 1024
+    upload_options = {
+        "max_concurrency": int(config.get("upload_concurrency", 4) or 4),
+        "retries": int(config.get("upload_retries", 3)),
+        "backoff_seconds": float(config.get("upload_backoff_seconds", 2)),
+        "manifest_file": target_path / "upload_manifest.json",
+        "force": force_upload,
+    }
     # Create dirs
     ensure_dirs(source_path)
     ensure_dirs(target_path)
@@ -148,11 +728,26 @@ def run_step6(config_path_str: str):
     log_file = setup_logging(metadata_folder)
     print("\nLakebridge core engine started\n")
     check_cli()
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # The input file list is built once here and passed on, instead of each stage globbing the folder
+    file_shas = None
+    if context is not None:
+        source_path = context.materialize(ROOT_DIR / "temp" / "step6_inputs" / ts / "preprocessed")
+        sql_files = sorted(source_path / name for name in context.file_names())
+        print(f"Using {len(sql_files)} preprocessed file(s) from step 5: {source_path}")
+    else:
+        # Nested folders and .prc/.tsql inputs are linked into one flat folder of .sql names;
+        # the index's hashes stand in for reading every file again
+        index = get_index(source_path, target_path / "input_index.json", **options_from_config(config))
+        inputs = index.scan()
+        if not index.is_flat():
+            source_path = index.materialize(inputs, ROOT_DIR / "temp" / "step6_inputs" / ts / "inputs")
+        sql_files = sorted(source_path / input_file.name for input_file in inputs)
+        file_shas = {input_file.name: input_file.sha256 for input_file in inputs}
     if run_validation:
-        validate_input_folder(source_path)
+        validate_input_folder(source_path, sql_files)
     analyzer_output_folder = target_path / "analyzer_output"
     ensure_dirs(analyzer_output_folder)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     analyzer_report_file = analyzer_output_folder / f"lakebridge_analysis_{ts}.xlsx"
     global_flags = []
     if profile:
@@ -160,60 +755,259 @@ def run_step6(config_path_str: str):
     if debug:
         global_flags += ["--debug"]
     analyzer_status_dict = {}
+    transpile_status_dict = {}
+    build_status_dict = {}
+    if file_shas is None:
+        file_shas = {sql_file.name: sha256_file(sql_file) for sql_file in sql_files}
+    journal = RunJournal.latest(target_path / "metadata") if resume else None
+    if journal is not None:
+        print(f"Resuming from journal {journal.path}")
+    else:
+        if resume:
+            print("No run journal found, starting a fresh run")
+        journal = RunJournal.create(metadata_folder, ts)
+    journal.event("start", resume=resume, files=len(sql_files))
+    cache = None
+    cache_keys = {}
+    if cache_enabled and run_transpiler:
+        cache = BuildCache(target_path / "build_cache", max_bytes=cache_max_mb * 1024 * 1024)
+        cli_version = get_lakebridge_version()
+        # Editing the dialect's pre- or postprocessor invalidates its cached outputs
+        preprocessor_hash = get_registry(ROOT_DIR / "dialects").source_hash(dialect)
+        for sql_file in sql_files:
+            with open(sql_file, "r", encoding="utf-8", errors="replace") as f:
+                key = cache_key(f.read(), dialect, cli_version, preprocessor_hash, sql_file.name)
+            cache_keys[sql_file.name] = key
+            entry = cache.lookup(key)
+            if entry is None:
+                build_status_dict[sql_file.name] = "Rebuilt"
+                continue
+            cache.restore(key, cache_artifacts(target_path, sql_file.name))
+            build_status_dict[sql_file.name] = "Cached"
+            analyzer_status_dict[sql_file.name] = entry["analyzer_status"]
+            transpile_status_dict[sql_file.name] = "Success"
+    cached_files = {name for name, build in build_status_dict.items() if build == "Cached"}
+    for name in cached_files:
+        journal.record(name, "analyze", analyzer_status_dict[name], file_shas[name])
+        journal.record(name, "transpile", "Success", file_shas[name])
+        journal.record(name, "build", "Cached", file_shas[name])
+    rebuild_files = [sql_file for sql_file in sql_files if sql_file.name not in cached_files]
+    converted_folder = target_path / "Converted_Code"
+    notebooks_folder = target_path / "Databricks_Notebooks"
+    # Files the resumed journal already carried through a stage are not sent through it again
+    skip_format = set(cached_files)
+    analyze_files, transpile_files = rebuild_files, rebuild_files
+    if resume:
+        analyze_files = [sql_file for sql_file in rebuild_files
+                         if not journal.is_done(sql_file.name, "analyze", file_shas[sql_file.name])]
+        transpile_files = []
+        for sql_file in rebuild_files:
+            name = sql_file.name
+            if not journal.is_done(name, "transpile", file_shas[name]) or not (converted_folder / name).exists():
+                transpile_files.append(sql_file)
+                continue
+            build_status_dict[name] = "Resumed"
+            journal.record(name, "build", "Resumed", file_shas[name])
+            if (journal.is_done(name, "notebook", file_shas[name])
+                    and (notebooks_folder / (sql_file.stem + ".py")).exists()):
+                skip_format.add(name)
+        print(f"Resume: {len(rebuild_files) - len(analyze_files)} file(s) already analyzed, "
+              f"{len(rebuild_files) - len(transpile_files)} already transpiled, "
+              f"{len(skip_format - cached_files)} already formatted")
+    # With cache hits or resumed files, only the remaining files are staged and analyzed
+    analyze_staging = ROOT_DIR / "temp" / "step6_inputs" / ts / "analyze"
     try:
-        if run_analyzer:
-            analyze_cmd = " ".join([
-                "databricks labs lakebridge analyze",
-                f'--source-directory "{source_path}"',
-                f'--report-file "{analyzer_report_file}"',
-                f'--source-tech {dialect}'
-            ] + global_flags)
-            run_cmd(analyze_cmd, "Lakebridge Analyze", log_file=log_file)
-            for sql_file in source_path.glob("*.sql"):
-                analyzer_status_dict[sql_file.name] = "Success"
+        if run_analyzer and analyze_files and not pipelined:
+            try:
+                analyzer_status_dict.update(run_analyze(
+                    analyze_files, source_path, analyzer_report_file, dialect, global_flags, analyze_staging,
+                    log_file, analyzer_shards, total_files=len(sql_files)
+                ))
+            except SystemExit:
+                # run_cmd exits on analyzer failure; keep that, but journal it first
+                for sql_file in analyze_files:
+                    journal.record(sql_file.name, "analyze", "Failed", file_shas[sql_file.name])
+                journal.event("aborted", stage="analyze")
+                journal.close()
+                raise
     except Exception as e:
         logging.error(f"Analyzer failed: {e}")
-        for sql_file in source_path.glob("*.sql"):
+        for sql_file in analyze_files:
             analyzer_status_dict[sql_file.name] = "Failed"
-    converted_folder = target_path / "Converted_Code"
+    if run_analyzer and not pipelined:
+        for sql_file in analyze_files:
+            journal.record(sql_file.name, "analyze", analyzer_status_dict[sql_file.name], file_shas[sql_file.name])
+    shutil.rmtree(analyze_staging, ignore_errors=True)
     ensure_dirs(converted_folder)
-    transpile_status_dict = {}
-    if run_transpiler:
-        print("\nStarting transpile per SQL file...")
-        for sql_file in source_path.glob("*.sql"):
-            try:
-                transpile_cmd = " ".join([
-                    "databricks labs lakebridge transpile",
-                    f'--input-source "{sql_file}"',
-                    f'--source-dialect {dialect}',
-                    f'--output-folder "{converted_folder}"'
-                ] + global_flags)
-                success = run_cmd(transpile_cmd, f"Transpile {sql_file.name}", log_file=log_file, ignore_failure=True)
-                transpile_status_dict[sql_file.name] = "Success" if success else "Failed"
-            except Exception as e:
-                logging.error(f"Transpile failed for {sql_file.name}: {e}")
-                transpile_status_dict[sql_file.name] = "Failed"
-    notebooks_folder = target_path / "Databricks_Notebooks"
-    post_process_summary = process_sql_files(converted_folder, notebooks_folder, metadata_folder) if run_transpiler else []
-    summary_file = metadata_folder / f"sql_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    cost_model = None
+    if schedule_by_cost and run_transpiler:
+        from cost_model import CostModel
+        cost_model = CostModel.from_metadata(
+            target_path / "metadata", metrics_by_file([analyzer_output_folder], analyzer_output_folder / ".metrics_cache")
+        )
+        print(f"Scheduling transpile by predicted cost ({len(cost_model.history)} file(s) with timing history)")
+    if transpile_backend == "worker" and run_transpiler and transpile_files:
+        if keep_warm and get_worker_pool() is not None:
+            print("Reusing the running lakebridge worker(s)")
+        elif start_worker_pool(max_workers, log_file=log_file, **worker_options):
+            print(f"Started {max_workers} lakebridge worker(s) ({worker_options['backend']})")
+    # Copies of a script, byte-identical or differing only in names and literals, are
+    # transpiled once per class and the output re-instantiated for the other members
+    dedup_plan = None
+    if dedup_mode in ("exact", "template") and run_transpiler and len(transpile_files) > 1:
+        from dedup import DedupPlan
+        dedup_plan = DedupPlan(transpile_files, templates=dedup_mode == "template")
+    primary_files = dedup_plan.representatives if dedup_plan is not None else transpile_files
+    if run_transpiler and not pipelined:
+        # Scripts above split_threshold_kb are cut at batch boundaries and their parts
+        # transpiled alongside the other files, then reassembled in order
+        split_plans = {}
+        if split_threshold:
+            for sql_file in primary_files:
+                if sql_file.stat().st_size >= split_threshold:
+                    plan = split_script(sql_file, ROOT_DIR / "temp" / "step6_inputs" / ts / "split" / "input",
+                                        split_max_parts)
+                    if plan:
+                        split_plans[sql_file.name] = plan
+                        print(f"Split {sql_file.name} into {len(plan)} parts")
+        whole_files = [sql_file for sql_file in primary_files if sql_file.name not in split_plans]
+        transpile_status_dict.update(run_transpile(
+            whole_files, dialect, converted_folder, ROOT_DIR / "temp" / "step6_inputs" / ts / "transpile",
+            global_flags, log_file, transpile_mode, batch_size, max_workers,
+            on_status=lambda name, status, error: journal.record(
+                name, "transpile", status, file_shas[name], **({"error": error} if error else {})),
+            cost_model=cost_model
+        ))
+        if split_plans:
+            parts_output = ROOT_DIR / "temp" / "step6_inputs" / ts / "split" / "output"
+            ensure_dirs(parts_output)
+            part_files = [part["path"] for plan in split_plans.values() for part in plan]
+            part_errors = {}
+            part_statuses = run_transpile(
+                part_files, dialect, parts_output, ROOT_DIR / "temp" / "step6_inputs" / ts / "split_transpile",
+                global_flags, log_file, transpile_mode, batch_size, max_workers,
+                on_status=lambda part_name, status, error: part_errors.update({part_name: error} if error else {}),
+                cost_model=cost_model
+            )
+            for name, plan in split_plans.items():
+                transpile_status_dict[name] = reassemble(name, plan, part_statuses, parts_output, converted_folder)
+                errors = [f"{part['path'].name}: {part_errors[part['path'].name]}"
+                          for part in plan if part['path'].name in part_errors]
+                extra = {"error": "; ".join(errors)} if errors and transpile_status_dict[name] != "Success" else {}
+                journal.record(name, "transpile", transpile_status_dict[name], file_shas[name], parts=len(plan), **extra)
+        if dedup_plan is not None and dedup_plan.duplicates:
+            retry = [dedup_plan.files[name] for name in dedup_plan.duplicates
+                     if not instantiate_duplicate(dedup_plan, name, converted_folder, journal, file_shas)]
+            if retry:
+                print(f"\n{len(retry)} duplicate(s) could not reuse their class's output, transpiling them")
+                transpile_status_dict.update(run_transpile(
+                    retry, dialect, converted_folder, ROOT_DIR / "temp" / "step6_inputs" / ts / "dedup_transpile",
+                    global_flags, log_file, transpile_mode, batch_size, max_workers,
+                    on_status=lambda name, status, error: journal.record(
+                        name, "transpile", status, file_shas[name], **({"error": error} if error else {})),
+                    cost_model=cost_model
+                ))
+        for sql_file in transpile_files:
+            journal.record(sql_file.name, "build", "Rebuilt", file_shas[sql_file.name])
+
+    def _journal_post_process(name, stage, status):
+        if name in file_shas:
+            journal.record(name, stage, status, file_shas[name])
+
+    if pipelined:
+        feed = cost_model.order(sql_files) if cost_model is not None else sql_files
+        if dedup_plan is not None:
+            # Duplicates go last, so their representatives are usually in flight by then
+            feed = sorted(feed, key=lambda sql_file: sql_file.name in dedup_plan.duplicates)
+        pipeline_analyzer_status, post_process_dict = run_pipeline(
+            feed, dialect, target_path,
+            ROOT_DIR / "temp" / "step6_inputs" / ts / "pipeline", global_flags, journal, file_shas,
+            analyze_names={sql_file.name for sql_file in analyze_files} if run_analyzer else set(),
+            transpile_names={sql_file.name for sql_file in transpile_files}, skip_format=skip_format,
+            log_file=log_file, analyzer_report_file=analyzer_report_file, run_transpiler=run_transpiler,
+            transpile_mode=transpile_mode, batch_size=batch_size, max_workers=max_workers,
+            analyzer_workers=analyzer_shards, split_threshold=split_threshold, split_max_parts=split_max_parts,
+            format_workers=format_workers, format_split_threshold=format_split_threshold,
+            upload_options=upload_options, queue_size=pipeline_queue_size, dedup_plan=dedup_plan
+        )
+        analyzer_status_dict.update(pipeline_analyzer_status)
+    else:
+        post_process_dict = dict(process_sql_files(
+            converted_folder, notebooks_folder, metadata_folder, skip_format,
+            log_file=log_file, upload_options=upload_options,
+            format_workers=format_workers, format_split_threshold=format_split_threshold,
+            on_status=_journal_post_process, dialect=dialect, file_names=[sql_file.name for sql_file in sql_files]
+        ) if run_transpiler else [])
+    if not keep_warm:
+        stop_worker_pool()
+    if cache is not None:
+        for sql_file in rebuild_files:
+            name = sql_file.name
+            if journal.status(name, "transpile", file_shas[name]) != "Success" or post_process_dict.get(name) != "Succeeded":
+                continue
+            cache.store(cache_keys[name], name, cache_artifacts(target_path, name),
+                        analyzer_status=journal.status(name, "analyze", file_shas[name]) or "Skipped",
+                        optional=OPTIONAL_ARTIFACTS)
+        cache.evict()
+        cache.save()
+        logging.info(cache.stats_line())
+        print(f"\n{cache.stats_line()}")
+    journal.event("finish")
+    class_sizes = {}
+    if dedup_plan is not None:
+        reused = [name for name in dedup_plan.duplicates
+                  if journal.detail(name, "transpile", "duplicate_of", file_shas[name])]
+        for line in dedup_plan.summary_lines(reused):
+            print(line)
+            logging.info(line)
+        class_sizes = dedup_plan.class_sizes()
+    # Complexity comes from this and earlier analyzer reports, read once into a columnar cache
+    metrics = metrics_by_file([analyzer_output_folder], analyzer_output_folder / ".metrics_cache")
+    # The summary is rebuilt from the journal so resumed files report their earlier results
+    summary_ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    summary_file = metadata_folder / f"sql_summary_{summary_ts}.csv"
     with open(summary_file, "w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(["Script Name", "Analyzer Status", "Transpile Status", "Post-process Status"])
-        all_files = set(list(analyzer_status_dict.keys()) + list(transpile_status_dict.keys()))
-        post_process_dict = dict(post_process_summary)
-        for file_name in all_files:
+        writer.writerow(["Script Name", "Analyzer Status", "Transpile Status", "Post-process Status",
+                         "Upload Status", "Build Status", "Complexity", "Line Count", "Issues", "Error",
+                         "Duplicate Of", "Class Size"])
+        for sql_file in sql_files:
+            file_name, sha = sql_file.name, file_shas[sql_file.name]
             writer.writerow([
                 file_name,
-                analyzer_status_dict.get(file_name, "Skipped" if not run_analyzer else "Failed"),
-                transpile_status_dict.get(file_name, "Skipped" if not run_transpiler else "Failed"),
-                post_process_dict.get(file_name, "Skipped" if not run_transpiler else "Failed"),
-            ])
+                journal.status(file_name, "analyze", sha) or ("Skipped" if not run_analyzer else "Failed"),
+                journal.status(file_name, "transpile", sha) or ("Skipped" if not run_transpiler else "Failed"),
+                journal.status(file_name, "notebook", sha) or ("Skipped" if not run_transpiler else "Failed"),
+                journal.status(file_name, "upload", sha) or "Skipped",
+                journal.status(file_name, "build", sha) or build_status_dict.get(file_name, "Rebuilt"),
+            ] + [metrics.get(file_name, {}).get(column, "") for column in ("complexity", "line_count", "issues")]
+              + [journal.detail(file_name, "transpile", "error", sha) or "",
+                 journal.detail(file_name, "transpile", "duplicate_of", sha) or "",
+                 class_sizes.get(dedup_plan.duplicates.get(file_name, file_name), "") if dedup_plan else ""])
+    journal.close()
+    shutil.rmtree(ROOT_DIR / "temp" / "step6_inputs" / ts, ignore_errors=True)
+    if context is not None:
+        context.cleanup()
+    report_json, report_csv = get_report().write(metadata_folder, summary_ts)
+    print(f"\nRun report saved at {report_json} and {report_csv}")
     print(f"\nAll tasks completed. Summary CSV saved at {summary_file}")
     return 0
 
-if __name__ == "__main__":
+def main(argv=None):
+    import argparse
     parser = argparse.ArgumentParser(description="Run step6 core engine")
     parser.add_argument("--config", required=True, help="Path to config.yaml")
-    args = parser.parse_args()
-    rc = run_step6(args.config)
-    sys.exit(rc)
+    parser.add_argument("--force-upload", action="store_true", help="Upload every notebook, ignoring the upload manifest")
+    parser.add_argument("--resume", action="store_true", help="Continue from the latest run journal, skipping finished work")
+    args = parser.parse_args(argv)
+    try:
+        return run_step6(args.config, force_upload=args.force_upload, resume=args.resume)
+    except KeyboardInterrupt:
+        # Don't leave lakebridge processes running behind an interrupted run
+        cancel_all()
+        stop_worker_pool()
+        print("\nInterrupted; running commands were stopped. Use --resume to continue.", file=sys.stderr)
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from pathlib import Path
+
+from command_runner import cancel_all
+from input_index import InputIndex, options_from_config
+from lakebridge_worker import stop_worker_pool
+from run_context import RunContext
+from run_report import start_report
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+# inotify events that can change an input file in a watched folder
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# Even with inotify the folder is rescanned this often, in case a watch was lost
+RESCAN_SECONDS = 30
+
+
+class InotifyWaiter:
+    """Blocks until the kernel reports activity in the watched folders (Linux only)."""
+
+    def __init__(self, folder: Path):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(str(folder)), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+        self.watched = set()
+
+    def add_folders(self, folders):
+        """
+        Watches sub folders not watched yet; a folder's watch does not cover its sub folders.
+        A folder that cannot be watched (e.g. removed meanwhile) is left to the periodic rescan.
+        """
+        # The kernel drops the watch of a removed folder; forget it so a new folder there is watched
+        self.watched = {folder for folder in self.watched if folder.is_dir()}
+        for folder in folders:
+            if folder not in self.watched and self.libc.inotify_add_watch(
+                    self.fd, os.fsencode(str(folder)), WATCH_MASK) >= 0:
+                self.watched.add(folder)
+
+    def wait(self, timeout):
+        """True if events arrived within timeout seconds; the events themselves are discarded."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollWaiter:
+    """Fallback: sleeps; the caller rescans the folder after each wait."""
+
+    def add_folders(self, folders):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """
+    Reports input files added, changed or removed under a folder, as paths relative
+    to it. Changes are found by comparing snapshots of the input index's walk
+    (relative path -> size, mtime), so editors that save through a rename are handled
+    the same as in-place writes; inotify, where available, only decides when to look.
+    A burst of changes is reported once nothing has changed for debounce_s seconds.
+    """
+
+    def __init__(self, folder: Path, backend: str = "auto", debounce_s: float = 1.0, poll_interval_s: float = 1.0,
+                 index_options=None):
+        self.folder = Path(folder)
+        # Walked without the persisted index: only sizes and mtimes are compared here
+        self.index = InputIndex(self.folder, **(index_options or {}))
+        self.debounce_s = debounce_s
+        self.poll_interval_s = poll_interval_s
+        self.waiter = None
+        if backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self.waiter = InotifyWaiter(self.folder)
+                self.backend = "inotify"
+            except OSError as e:
+                if backend == "inotify":
+                    raise
+                print(f"inotify unavailable ({e}); polling instead", file=sys.stderr)
+        elif backend == "inotify":
+            raise OSError("inotify is only available on Linux")
+        if self.waiter is None:
+            self.waiter = PollWaiter()
+            self.backend = "poll"
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for rel_path, entry in self.index.walk():
+            stat = entry.stat()
+            state[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        self.waiter.add_folders(self.index.folders)
+        return state
+
+    def next_changes(self):
+        """Blocks until files change; returns (added or changed paths, removed paths), relative to the folder."""
+        timeout = RESCAN_SECONDS if self.backend == "inotify" else self.poll_interval_s
+        while True:
+            self.waiter.wait(timeout)
+            current = self.snapshot()
+            if current != self.state:
+                break
+        # Debounce: wait for a window without changes, so half-written files are not picked up
+        while True:
+            # With inotify this returns once debounce_s pass without events; polling sleeps debounce_s once
+            while self.waiter.wait(self.debounce_s):
+                pass
+            latest = self.snapshot()
+            if latest == current:
+                break
+            current = latest
+        changed = sorted(name for name, stat in current.items() if self.state.get(name) != stat)
+        removed = sorted(set(self.state) - set(current))
+        self.state = current
+        return changed, removed
+
+    def close(self):
+        self.waiter.close()
+
+
+def convert(config_path: Path, files, force_upload: bool = False):
+    """Runs step 5 and step 6 on just these input files in this process; returns step 6's exit code."""
+    # Imported through the same module names last_full_main uses
+    import step5_preprocess
+    import step6_core_engine
+
+    start_report()
+    step5_result = step5_preprocess.run_step5(None, config_path, files=files)
+    if step5_result is None:
+        return 1
+    context = RunContext.from_step5_result(step5_result, config_path)
+    try:
+        return step6_core_engine.run_step6(str(config_path), force_upload, context, keep_warm=True)
+    except SystemExit as e:
+        # Step 6 exits on a failed command; in watch mode the next change gets a fresh run
+        return e.code if isinstance(e.code, int) else 1
+    finally:
+        # run_step6 cleans up after itself, but not when it exits early
+        context.cleanup()
+
+
+def watch(config_path: Path, initial: bool = False, backend=None, debounce_s=None, poll_interval_s=None):
+    import yaml
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    dialect = config.get("dialect", "synapse").lower().replace(" ", "_")
+    input_folder = Path(config.get("source_path", str(ROOT_DIR / "input"))) / dialect
+    input_folder.mkdir(parents=True, exist_ok=True)
+    watcher = FolderWatcher(
+        input_folder,
+        backend=backend or str(config.get("watch_backend", "auto")).lower(),
+        debounce_s=debounce_s if debounce_s is not None else float(config.get("watch_debounce_ms", 1000)) / 1000,
+        poll_interval_s=poll_interval_s if poll_interval_s is not None
+        else float(config.get("watch_poll_interval_s", 1.0)),
+        index_options=options_from_config(config),
+    )
+    print(f"Watching {input_folder} ({watcher.backend}, debounce {watcher.debounce_s:.1f}s); Ctrl+C to stop")
+    try:
+        if initial and watcher.state:
+            convert(config_path, [input_folder / name for name in sorted(watcher.state)])
+        while True:
+            changed, removed = watcher.next_changes()
+            for name in removed:
+                print(f"[watch] {name} removed; its converted outputs are kept")
+            if not changed:
+                continue
+            print(f"\n[watch] {len(changed)} file(s) changed: {', '.join(changed)}")
+            started = time.perf_counter()
+            rc = convert(config_path, [input_folder / name for name in changed])
+            status = "done" if rc == 0 else f"failed (exit {rc})"
+            print(f"[watch] {len(changed)} file(s) {status} in {time.perf_counter() - started:.1f}s; watching")
+    except KeyboardInterrupt:
+        cancel_all()
+        print("\nWatch stopped.", file=sys.stderr)
+        return 130
+    finally:
+        stop_worker_pool()
+        watcher.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert input SQL files as they are added or changed")
+    parser.add_argument("--config", default=str(ROOT_DIR / "config" / "config.yaml"), help="Path to config.yaml")
+    parser.add_argument("--initial", action="store_true", help="Convert every input file once before watching")
+    parser.add_argument("--backend", choices=("auto", "inotify", "poll"), help="Overrides watch_backend")
+    parser.add_argument("--debounce-ms", type=float, help="Overrides watch_debounce_ms")
+    parser.add_argument("--poll-interval", type=float, help="Overrides watch_poll_interval_s")
+    args = parser.parse_args(argv)
+    config_path = Path(args.config)
+    if not config_path.exists():
+        print(f"Config file {config_path} not found.", file=sys.stderr)
+        return 10
+    return watch(config_path, args.initial, args.backend,
+                 args.debounce_ms / 1000 if args.debounce_ms is not None else None, args.poll_interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())